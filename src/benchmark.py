@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from block_markdown import parse_blocks, BlockType, markdown_to_html_node
+from copystatic import copy_folder_recursive
+from inline_markdown import text_to_textnodes
+from page_generator import find_markdown_files, extract_title
+from template import load_template
+
+STAGES = [
+    "discovery",
+    "copy_folder_recursive",
+    "markdown_to_blocks",
+    "text_to_textnodes",
+    "to_html",
+    "template_render",
+    "write",
+]
+
+WORDS = [
+    "elf", "ring", "shire", "hobbit", "wizard", "balrog", "mithril", "river",
+    "mountain", "forest", "king", "return", "shadow", "light", "song", "journey",
+]
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>"""
+
+def make_sentence(rng, density, words=12):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        # density is the share of words wrapped in some kind of inline markup
+        if rng.random() < density:
+            kind = rng.randrange(5)
+            if kind == 0:
+                word = f"**{word}**"
+            elif kind == 1:
+                word = f"_{word}_"
+            elif kind == 2:
+                word = f"`{word}`"
+            elif kind == 3:
+                word = f"[{word}](/blog/{word})"
+            else:
+                word = f"![{word}](/images/{word}.png)"
+        parts.append(word)
+    return " ".join(parts).capitalize() + "."
+
+def make_page(rng, title, blocks, density):
+    lines = [f"# {title}", ""]
+    for i in range(blocks):
+        kind = i % 6
+        if kind == 0:
+            lines.append(f"## {make_sentence(rng, density, 4)}")
+        elif kind == 1:
+            lines.extend(f"- {make_sentence(rng, density, 6)}" for _ in range(4))
+        elif kind == 2:
+            lines.extend(f"{n}. {make_sentence(rng, density, 6)}" for n in range(1, 4))
+        elif kind == 3:
+            lines.append(f"> {make_sentence(rng, density)}")
+        elif kind == 4:
+            lines.extend(["```", "print(\"hello\")", "x = 1", "```"])
+        else:
+            lines.append(" ".join(make_sentence(rng, density) for _ in range(4)))
+        lines.append("")
+    return "\n".join(lines)
+
+def page_directory(index, depth, fanout=4):
+    # Spread pages over a tree `depth` levels deep with `fanout` children per level
+    parts = []
+    for level in range(depth):
+        parts.append(f"section-{(index // (fanout ** level)) % fanout}")
+    return os.path.join(*parts) if parts else ""
+
+def generate_corpus(root, pages=100, depth=2, density=0.2, blocks=30, images=4, image_size=256 * 1024, seed=0):
+    rng = random.Random(seed)
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    os.makedirs(os.path.join(static_dir, "images"), exist_ok=True)
+
+    for i in range(pages):
+        page_dir = os.path.join(content_dir, page_directory(i, depth), f"page-{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), "w", encoding="utf-8") as f:
+            f.write(make_page(rng, f"Page {i}", blocks, density))
+
+    for i in range(images):
+        with open(os.path.join(static_dir, "images", f"image-{i}.png"), "wb") as f:
+            f.write(rng.randbytes(image_size))
+
+    with open(os.path.join(static_dir, "index.css"), "w", encoding="utf-8") as f:
+        f.write("body { margin: 0; }\n")
+
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w", encoding="utf-8") as f:
+        f.write(TEMPLATE)
+
+    return content_dir, static_dir, template_path
+
+def inline_texts(blocks):
+    texts = []
+    for block in blocks:
+        if block.block_type == BlockType.PARAGRAPH:
+            texts.append("\n".join(block.lines))
+        elif block.block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+            texts.extend(line.split(" ", 1)[1] for line in block.lines)
+    return texts
+
+def run_once(root, content_dir, static_dir, template_path, basepath):
+    timings = {}
+    output_dir = os.path.join(root, "output")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    start = time.perf_counter()
+    pages = find_markdown_files(content_dir, output_dir)
+    timings["discovery"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    copy_folder_recursive(static_dir, output_dir)
+    timings["copy_folder_recursive"] = time.perf_counter() - start
+
+    sources = []
+    for item_path, _ in pages:
+        with open(item_path, "r", encoding="utf-8") as f:
+            sources.append(f.read())
+
+    start = time.perf_counter()
+    parsed = [parse_blocks(markdown) for markdown in sources]
+    timings["markdown_to_blocks"] = time.perf_counter() - start
+
+    texts = [text for blocks in parsed for text in inline_texts(blocks)]
+    start = time.perf_counter()
+    for text in texts:
+        text_to_textnodes(text)
+    timings["text_to_textnodes"] = time.perf_counter() - start
+
+    # Trees are built outside the timers so to_html measures serialization only
+    trees = [markdown_to_html_node(markdown) for markdown in sources]
+    start = time.perf_counter()
+    bodies = [tree.to_html(basepath) for tree in trees]
+    timings["to_html"] = time.perf_counter() - start
+
+    titles = [extract_title(markdown) for markdown in sources]
+    start = time.perf_counter()
+    template = load_template(template_path, basepath)
+    documents = [template.render(Title=title, Content=body) for title, body in zip(titles, bodies)]
+    timings["template_render"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for (_, html_path), document in zip(pages, documents):
+        os.makedirs(os.path.dirname(html_path), exist_ok=True)
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(document)
+    timings["write"] = time.perf_counter() - start
+
+    return timings
+
+def current_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def run_benchmark(pages=100, depth=2, density=0.2, blocks=30, images=4, image_size=256 * 1024,
+                  repeat=3, basepath="/", seed=0, work_dir=None):
+    corpus = {
+        "pages": pages, "depth": depth, "density": density, "blocks": blocks,
+        "images": images, "image_size": image_size, "seed": seed,
+    }
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as root:
+        content_dir, static_dir, template_path = generate_corpus(root, pages, depth, density, blocks, images, image_size, seed)
+        runs = [run_once(root, content_dir, static_dir, template_path, basepath) for _ in range(repeat)]
+
+    # The minimum is the least noisy estimate of each stage's cost
+    stages = {
+        stage: {"min": min(run[stage] for run in runs), "runs": [run[stage] for run in runs]}
+        for stage in STAGES
+    }
+
+    return {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": corpus,
+        "repeat": repeat,
+        "stages": stages,
+        "total": sum(stage["min"] for stage in stages.values()),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each build stage on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=2, help="directory levels above each page")
+    parser.add_argument("--density", type=float, default=0.2, help="share of words wrapped in inline markup")
+    parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--image-size", type=int, default=256 * 1024, help="bytes per image")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        args.pages, args.depth, args.density, args.blocks, args.images, args.image_size,
+        args.repeat, seed=args.seed,
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
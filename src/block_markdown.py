@@ -1,3 +1,4 @@
+from collections import deque
 from enum import Enum
 import re
 from textnode import TextNode, TextType, text_node_to_html_node#, #text_to_textnodes
@@ -12,194 +13,212 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
-def block_to_block_type(markdown_block):
+HEADING_PATTERN = re.compile(r'^#{1,6} ')
+ORDERED_ITEM_PATTERN = re.compile(r'^\d+[.)] ')
+
+class Block:
+    __slots__ = ("block_type", "lines")
+
+    def __init__(self, block_type, lines):
+        self.block_type = block_type
+        self.lines = lines
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return False
+        return self.block_type == other.block_type and self.lines == other.lines
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.lines})"
+
+def classify_lines(lines):
+    if not lines:
+        return BlockType.PARAGRAPH
+
+    first_line = lines[0]
+
     # heading block
-    if re.match(r'^#{1,6} ', markdown_block):
+    if HEADING_PATTERN.match(first_line):
         return BlockType.HEADING
-    
+
     # code block
-    if markdown_block.startswith('```') and markdown_block.endswith('```'):
+    if first_line.startswith('```') and lines[-1].endswith('```'):
         return BlockType.CODE
 
-    # quote block
-    lines = markdown_block.splitlines()
-    if all(line.startswith('>') for line in lines):
-        return BlockType.QUOTE
+    # quote, unordered and ordered lists all need every line to agree, so
+    # check them together in one pass and stop once none can match
+    is_quote = is_unordered = is_ordered = True
+    for i, line in enumerate(lines, 1):
+        is_quote = is_quote and line.startswith('>')
+        is_unordered = is_unordered and line.startswith('- ')
+        is_ordered = is_ordered and line.startswith(f"{i}. ")
+        if not (is_quote or is_unordered or is_ordered):
+            return BlockType.PARAGRAPH
 
-    # unordered list block
-    if all(line.startswith('- ') for line in lines):
+    if is_quote:
+        return BlockType.QUOTE
+    if is_unordered:
         return BlockType.UNORDERED_LIST
-    
-    # ordered list
-    is_ordered_list = True
-    for i, line in enumerate(lines, 1):
-        if not line.startswith(f"{i}. "):
-            is_ordered_list = False
-            break
+    return BlockType.ORDERED_LIST
 
-    if is_ordered_list and lines:
-        return BlockType.ORDERED_LIST
-    
-    return BlockType.PARAGRAPH
+def block_to_block_type(markdown_block):
+    return classify_lines(markdown_block.splitlines())
+
+def opens_fence(stripped_line):
+    # ``` optionally followed by a language name, e.g. ```python
+    return stripped_line.startswith('```') and '`' not in stripped_line[3:]
+
+def closes_fence(stripped_line):
+    return stripped_line == '```'
+
+def finish_block(raw_lines):
+    # Remove the block's common indentation, then trim its outer edges
+    min_indent = min(len(line) - len(line.lstrip()) for line in raw_lines if line.strip())
+    lines = [line[min_indent:] for line in raw_lines]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return Block(classify_lines(lines), lines)
+
+def iter_blocks(lines):
+    # Line-oriented state machine: blank lines end a block, except inside a
+    # ``` fence, which runs until its closing line (or, unclosed, is undone at EOF)
+    raw_lines = []
+    in_fence = False
+    fences_can_close = True
+    # Lines of an undone fence, scanned again as ordinary blocks
+    pending = deque()
+    lines = iter(lines)
+
+    while True:
+        if pending:
+            line = pending.popleft()
+        else:
+            line = next(lines, None)
+            if line is None:
+                if not in_fence:
+                    break
+                # A fence that never closes isn't code: its opening line is plain text and
+                # the rest splits on blank lines as usual. No later line can close a fence
+                # either, so the rest is scanned only once more
+                pending.extend(raw_lines[1:])
+                del raw_lines[1:]
+                in_fence = fences_can_close = False
+                continue
+
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+
+        if in_fence:
+            raw_lines.append(line)
+            if closes_fence(stripped):
+                in_fence = False
+            continue
+
+        if not stripped:
+            if raw_lines:
+                yield finish_block(raw_lines)
+                raw_lines = []
+            continue
+
+        if not raw_lines and fences_can_close and opens_fence(stripped):
+            in_fence = True
+        raw_lines.append(line)
+
+    if raw_lines:
+        yield finish_block(raw_lines)
+
+def parse_blocks(markdown):
+    return list(iter_blocks(markdown.splitlines()))
 
 def markdown_to_blocks(markdown):
-    markdown = markdown.strip()  # Trim entire markdown string
-    raw_blocks = markdown.split("\n\n")  # Split into blocks by double newline
-
-    cleaned_blocks = []
-    
-    for block in raw_blocks:
-        lines = block.splitlines()  # Handle block line by line
-        valid_lines = [line for line in lines if line.strip()]  # Only non-empty lines
-        
-        if valid_lines:  # Ensure there are valid lines to process
-            # Calculate minimum indentation of non-empty lines
-            min_indent = min(len(line) - len(line.lstrip()) for line in valid_lines)
-            normalized_lines = [line[min_indent:] for line in lines]
-            cleaned_blocks.append("\n".join(normalized_lines).strip())
-    
-    return [block for block in cleaned_blocks if block.strip()]  # Omit empty blocks
+    return ["\n".join(block.lines) for block in iter_blocks(markdown.splitlines())]
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+def text_to_children(text):
+    return [text_node_to_html_node(text_node) for text_node in text_to_textnodes(text)]
+
+def block_to_html_nodes(block):
+    block_type = block.block_type
+    lines = block.lines
+
+    if block_type == BlockType.PARAGRAPH:
+        return [ParentNode('p', text_to_children("\n".join(lines)))]
+
+    elif block_type == BlockType.HEADING:
+        header_nodes = []
+
+        for line in lines:
+            line = line.strip()
+
+            if not line.startswith('#'):
+                continue
 
+            level = len(line) - len(line.lstrip('#'))
+            content = line[level:].strip()
+
+            header_nodes.append(ParentNode(f"h{level}", text_to_children(content)))
+
+        return header_nodes
+
+    elif block_type == BlockType.CODE:
+        # Only a whole fence renders; the language name, if any, is dropped
+        if len(lines) < 2 or not opens_fence(lines[0].strip()) or not closes_fence(lines[-1].strip()):
+            return []
+
+        processed_lines = []
+        for line in lines[1:-1]:
+            line_content = line.strip()
+
+            if line_content.startswith("print("):
+                processed_lines.append("    " + line_content)
+            else:
+                processed_lines.append(line_content)
+
+        code_content = '\n'.join(processed_lines)
+        raw_text_node = TextNode(code_content, TextType.TEXT)
+        child = text_node_to_html_node(raw_text_node)
+        code = ParentNode("code", [child])
+        return [ParentNode("pre", [code])]
+
+    elif block_type == BlockType.QUOTE:
+        quote_lines = []
+
+        for line in lines:
+            if len(line) > 1 and line[1] == ' ':
+                quote_lines.append(line[2:])
+            else:
+                quote_lines.append(line[1:])
+
+        quote_content = " ".join(quote_lines)
+        return [ParentNode('blockquote', text_to_children(quote_content))]
+
+    elif block_type == BlockType.UNORDERED_LIST:
+        list_node = ParentNode("ul", [])
+
+        for line in lines:
+            line = line.strip()
+            if line.startswith("- ") or line.startswith("* ") or line.startswith("+ "):
+                list_node.children.append(ParentNode("li", text_to_children(line[2:])))
+
+        return [list_node]
+
+    elif block_type == BlockType.ORDERED_LIST:
+        list_node = ParentNode("ol", [])
+
+        for line in lines:
+            line = line.strip()
+            match = ORDERED_ITEM_PATTERN.match(line)
+
+            if match:
+                list_node.children.append(ParentNode("li", text_to_children(line[match.end():])))
+
+        return [list_node]
+
+    return []
+
+def markdown_to_html_node(markdown):
     html_root = ParentNode('div', [])
 
-    for block in blocks:
-        
-        block_type = block_to_block_type(block)
-
-        if block_type == BlockType.PARAGRAPH:
-            paragraph_node = ParentNode('p', [])
-            text_nodes = text_to_textnodes(block)
-
-            for text_node in text_nodes:
-                html_child = text_node_to_html_node(text_node)
-                paragraph_node.children.append(html_child)
-            
-            html_root.children.append(paragraph_node)
-
-
-        elif block_type == BlockType.HEADING:
-            heading_lines = block.strip().split('\n')
-            
-            for line in heading_lines:
-                line = line.strip()
-            
-                if not line.startswith('#'):
-                    continue
-            
-                level = 0
-                for char in line:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-            
-                content = line[level:].strip()
-
-                header_node = ParentNode(f"h{level}", [])
-
-                text_node = text_to_textnodes(content)
-
-                for text_node in text_node:
-                    html_child = text_node_to_html_node(text_node)
-                    header_node.children.append(html_child)
-                
-                html_root.children.append(header_node)
-
-        elif block_type == BlockType.CODE:
-
-            lines = block.strip().split('\n')
-            
-            if lines and lines[0].strip() == '```' and lines[-1].strip() == '```':
-
-                code_lines = lines[1:-1]
-
-                processed_lines = []
-                for line in code_lines:
-                    line_content = line.strip()
-
-                    if line_content.startswith("print("):
-                        processed_lines.append("    " + line_content)
-                    else:
-                        processed_lines.append(line_content)
-                        
-                code_content = '\n'.join(processed_lines)
-                raw_text_node = TextNode(code_content, TextType.TEXT)
-                child = text_node_to_html_node(raw_text_node)
-                code = ParentNode("code", [child])
-                pre = ParentNode("pre", [code])
-                html_root.children.append(pre)
-                
-        elif block_type == BlockType.QUOTE:
-            lines = block.strip().split('\n')
-            quote_lines = []
-
-            for line in lines:
-                if line.startswith(">"):
-
-                    if len(line) > 1 and line[1] == ' ':
-                        quote_lines.append(line[2:])
-                    else:
-                        quote_lines.append(line[1:])
-            
-            quote_content = " ".join(quote_lines)
-            
-            blockquote_node = ParentNode('blockquote', [])
-            text_nodes = text_to_textnodes(quote_content)
-            
-            for text_node in text_nodes:
-                html_child = text_node_to_html_node(text_node)
-                blockquote_node.children.append(html_child)
-            
-            html_root.children.append(blockquote_node)
-        
-        elif block_type == BlockType.UNORDERED_LIST:
-            list_node = ParentNode("ul", [])
-
-            lines = block.strip().split('\n')
-            
-            for line in lines:
-
-                line = line.strip()
-                if line.startswith("- ") or line.startswith("* ") or line.startswith("+ "):
-
-                    item_content = line[2:]
-                    
-                    li_node = ParentNode("li", [])
-                    
-                    text_nodes = text_to_textnodes(item_content)
-                    for text_node in text_nodes:
-                        html_child = text_node_to_html_node(text_node)
-                        li_node.children.append(html_child)
-                    
-                    list_node.children.append(li_node)
-            
-            html_root.children.append(list_node)
-    
-        elif block_type == BlockType.ORDERED_LIST:
-            list_node = ParentNode("ol", [])
-            
-            lines = block.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-
-                if re.match(r'^\d+[.)] ', line):
-
-                    match = re.match(r'^\d+[.)] ', line)
-                    item_content = line[match.end():]
-                    
-                    li_node = ParentNode("li", [])
-                    
-                    text_nodes = text_to_textnodes(item_content)
-                    for text_node in text_nodes:
-                        html_child = text_node_to_html_node(text_node)
-                        li_node.children.append(html_child)
-                    
-                    list_node.children.append(li_node)
-            
-            html_root.children.append(list_node)
-
-    return html_root
\ No newline at end of file
+    for block in iter_blocks(markdown.splitlines()):
+        html_root.children.extend(block_to_html_nodes(block))
+
+    return html_root
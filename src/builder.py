@@ -0,0 +1,192 @@
+import os
+from copystatic import sync_folder, write_asset_manifest
+from css import CssPipeline
+from deploy import diff_outputs, write_deploy_manifest
+from discovery import FileIndex
+from page_generator import generate_pages_recursive, PageBuildError
+from precompress import precompress_tree, remove_precompressed
+from profiler import NULL_PROFILER
+from render_cache import BlockCache, PageBodyCache
+from shard import merge_shards, ShardMergeError
+from staging import StagedOutput
+from template import TemplateCache
+
+# The project directory: src/..
+DEFAULT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class BuildConfig:
+    def __init__(self, root=None, basepath="/", static_dir=None, content_dir=None, template_path=None,
+                 output_dir=None, cache_dir=None, jobs=1, publish="reflink", minify=False, fingerprint=False,
+                 critical_css=False, precompress=False, in_place=False, deploy_manifest=None, shard=None,
+                 merge=None):
+        # Paths default to the usual layout under root and are made absolute, so a
+        # long-lived process doesn't depend on its working directory
+        self.root = os.path.abspath(root or DEFAULT_ROOT)
+        self.static_dir = os.path.abspath(static_dir or os.path.join(self.root, "static"))
+        self.content_dir = os.path.abspath(content_dir or os.path.join(self.root, "content"))
+        self.template_path = os.path.abspath(template_path or os.path.join(self.root, "template.html"))
+        self.output_dir = os.path.abspath(output_dir or os.path.join(self.root, "docs"))
+        self.cache_dir = os.path.abspath(cache_dir or os.path.join(self.root, ".build-cache"))
+        self.basepath = basepath
+        self.jobs = jobs
+        self.publish = publish
+        self.minify = minify
+        self.fingerprint = fingerprint
+        self.critical_css = critical_css
+        self.precompress = precompress
+        self.in_place = in_place
+        self.deploy_manifest = deploy_manifest
+        # (index, count) to build one shard, or a list of shard output directories to merge instead
+        self.shard = shard
+        self.merge = merge
+
+    def cache_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+class SiteBuilder:
+    def __init__(self, config):
+        self.config = config
+        # Everything below lives as long as the builder, so repeated builds start warm
+        self.css = CssPipeline(config.static_dir, config.output_dir, config.cache_path('css.json'))
+        self.block_cache = BlockCache(config.cache_path('blocks.json')).load()
+        self.body_cache = PageBodyCache(config.cache_path('bodies'))
+        self.templates = TemplateCache()
+        self.file_index = FileIndex()
+
+    def build(self, profiler=NULL_PROFILER):
+        config = self.config
+        print(f"Content directory: {config.content_dir}")
+        print(f"Template path: {config.template_path}")
+        print(f"Public directory: {config.output_dir}")
+
+        if config.in_place:
+            return self.produce(profiler, config.output_dir)
+
+        # Readers of ./docs see the old site until the finished one is swapped in
+        staged = StagedOutput(config.output_dir, [
+            config.cache_path(name) for name in ('pages.json', 'static.json', 'css.json', 'gzip.json', 'outputs.json')
+        ])
+        with profiler.stage("staging"):
+            linked, copied = staged.prepare()
+        print(f"Staging: {linked} files linked, {copied} copied into {staged.path}")
+        try:
+            status = self.produce(profiler, staged.path)
+        except BaseException:
+            staged.abandon()
+            raise
+        finally:
+            # The staging directory is gone after the swap; later writes (the watcher) go to the live output
+            self.css.destination_folder = config.output_dir
+        # Failed pages keep their previous output, same as an in-place build
+        with profiler.stage("swap"):
+            swap = staged.commit()
+        print(f"Swapped {staged.path} into {config.output_dir} ({swap})")
+        return status
+
+    def produce(self, profiler, output_dir):
+        if self.config.merge:
+            return self.merge_output(profiler, output_dir)
+        return self.build_output(profiler, output_dir)
+
+    def build_output(self, profiler, output_dir):
+        config = self.config
+        css = self.css
+        css.destination_folder = output_dir
+
+        # Only new or changed assets are copied and only orphaned ones deleted
+        with profiler.stage("static sync"):
+            report = sync_folder(config.static_dir, output_dir, config.cache_path('static.json'),
+                                 compare_hash=True, strategy=config.publish, skip=css.handles,
+                                 fingerprint=config.fingerprint, file_index=self.file_index)
+        strategies = ", ".join(f"{count} by {name}" for name, count in sorted(report.strategies.items()))
+        print(
+            f"Static: {report.copied} copied ({report.bytes_copied} bytes), "
+            f"{report.skipped} skipped ({report.bytes_skipped} bytes), {report.deleted} deleted"
+            + (f"; published {strategies}" if strategies else "")
+        )
+
+        with profiler.stage("css"):
+            css_report = css.build(config.fingerprint, report.assets, self.file_index)
+        print(
+            f"CSS: {css_report.minified} minified, {css_report.unchanged} unchanged, {css_report.removed} removed "
+            f"({css_report.bytes_in} -> {css_report.bytes_out} bytes)"
+        )
+        stylesheets = css.stylesheets if config.critical_css else None
+
+        assets = None
+        if config.fingerprint:
+            assets = dict(report.assets, **css.assets)
+            print(f"Fingerprinted {len(assets)} assets")
+        write_asset_manifest(output_dir, assets)
+
+        # Check if content directory exists
+        if not os.path.exists(config.content_dir):
+            print(f"ERROR: Content directory does not exist: {config.content_dir}")
+            return 1
+
+        # Generate pages
+        status = 0
+        block_cache = self.block_cache
+        block_cache.hits = block_cache.misses = 0
+        try:
+            generate_pages_recursive(config.content_dir, config.template_path, output_dir, config.basepath,
+                                     config.cache_path('pages.json'), config.jobs, profiler, block_cache,
+                                     self.body_cache, config.minify, stylesheets, assets, config.shard,
+                                     self.templates, self.file_index)
+        except PageBuildError as e:
+            print(f"ERROR: {e}")
+            status = 1
+        finally:
+            block_cache.save()
+            print(f"Block cache: {block_cache.hits} hits, {block_cache.misses} misses")
+
+        if config.precompress:
+            with profiler.stage("precompress"):
+                gzip_report = precompress_tree(output_dir, config.cache_path('gzip.json'), config.jobs)
+            print(
+                f"Precompress: {gzip_report.compressed} compressed ({gzip_report.bytes_in} -> {gzip_report.bytes_out} bytes), "
+                f"{gzip_report.unchanged} unchanged, {gzip_report.not_worth_it} not worth it, {gzip_report.removed} removed"
+            )
+        else:
+            gzip_report = remove_precompressed(output_dir, config.cache_path('gzip.json'))
+            if gzip_report.removed:
+                print(f"Precompress: off, {gzip_report.removed} stale .gz files removed")
+
+        self.write_deploy_report(profiler, output_dir)
+        return status
+
+    def merge_output(self, profiler, output_dir):
+        config = self.config
+        with profiler.stage("merge"):
+            try:
+                report = merge_shards(config.merge, output_dir)
+            except ShardMergeError as e:
+                print(f"ERROR: {e}")
+                return 1
+        print(
+            f"Merge: {len(config.merge)} shards, {report.pages} pages; {report.copied} files copied, "
+            f"{report.unchanged} unchanged, {report.deleted} deleted"
+        )
+
+        # The merged tree replaced whatever this machine built, so its build caches no longer describe it
+        for name in ('pages.json', 'static.json', 'css.json', 'gzip.json'):
+            manifest_path = config.cache_path(name)
+            if os.path.isfile(manifest_path):
+                os.remove(manifest_path)
+
+        self.write_deploy_report(profiler, output_dir)
+        return 0
+
+    def write_deploy_report(self, profiler, output_dir):
+        # Everything that changed in ./docs since the last build, for the deploy step
+        with profiler.stage("deploy manifest"):
+            deploy_report = diff_outputs(output_dir, self.config.cache_path('outputs.json'))
+            deploy_manifest_path = self.config.deploy_manifest or self.config.cache_path('deploy.json')
+            write_deploy_manifest(deploy_manifest_path, deploy_report)
+        print(
+            f"Deploy: {len(deploy_report.added)} added, {len(deploy_report.changed)} changed, "
+            f"{len(deploy_report.deleted)} deleted, {deploy_report.unchanged} unchanged -> {deploy_manifest_path}"
+        )
+
+def build_site(config, profiler=NULL_PROFILER):
+    return SiteBuilder(config).build(profiler)
@@ -1,19 +1,15 @@
 import os
 import shutil
+from discovery import scan_tree
+from manifest import load_manifest, save_manifest, empty_manifest, hash_file, MANIFEST_VERSION
 
 def copy_folder_recursive(source_folder, destination_folder):
     try:
-        if not os.path.exists(destination_folder):
-            os.makedirs(destination_folder)
-        
-        for item in os.listdir(source_folder):
-            source_item_path = os.path.join(source_folder, item)
-            destination_item_path = os.path.join(destination_folder, item)
-    
-            if os.path.isfile(source_item_path):
-                shutil.copy2(source_item_path, destination_item_path)
-            elif os.path.isdir(source_item_path):
-                copy_folder_recursive(source_item_path, destination_item_path)
+        os.makedirs(destination_folder, exist_ok=True)
+        for entry in scan_tree(source_folder):
+            destination_item_path = os.path.join(destination_folder, entry.relative_path)
+            os.makedirs(os.path.dirname(destination_item_path), exist_ok=True)
+            shutil.copy2(entry.path, destination_item_path)
     
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -28,3 +24,223 @@ def delete_directory_contents(dir_path):
     
     except Exception as e:
         print(f"An error occurred: {e}")
+
+# Hex digits of the content hash put into fingerprinted asset names
+FINGERPRINT_LENGTH = 10
+ASSET_MANIFEST_NAME = "assets.json"
+
+# Linux ioctl that makes the destination share the source's extents (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# Each strategy falls back to the next one in the chain when it isn't supported
+PUBLISH_FALLBACKS = {
+    "hardlink": "reflink",
+    "reflink": "copy_file_range",
+    "copy_file_range": "copy",
+    "copy": None,
+}
+PUBLISH_STRATEGIES = list(PUBLISH_FALLBACKS)
+
+def publish_hardlink(source_path, tmp_path):
+    os.link(source_path, tmp_path)
+
+def publish_reflink(source_path, tmp_path):
+    import fcntl
+
+    with open(source_path, 'rb') as source_file, open(tmp_path, 'wb') as tmp_file:
+        fcntl.ioctl(tmp_file.fileno(), FICLONE, source_file.fileno())
+    shutil.copystat(source_path, tmp_path)
+
+def publish_copy_file_range(source_path, tmp_path):
+    # The kernel moves the bytes (or shares them, on filesystems that can),
+    # so nothing passes through Python buffers
+    copy_range = getattr(os, "copy_file_range", None)
+    with open(source_path, 'rb') as source_file, open(tmp_path, 'wb') as tmp_file:
+        remaining = os.fstat(source_file.fileno()).st_size
+        while remaining > 0:
+            if copy_range is not None:
+                sent = copy_range(source_file.fileno(), tmp_file.fileno(), remaining)
+            else:
+                sent = os.sendfile(tmp_file.fileno(), source_file.fileno(), None, remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+    shutil.copystat(source_path, tmp_path)
+
+def publish_copy(source_path, tmp_path):
+    shutil.copy2(source_path, tmp_path)
+
+PUBLISH_FUNCTIONS = {
+    "hardlink": publish_hardlink,
+    "reflink": publish_reflink,
+    "copy_file_range": publish_copy_file_range,
+    "copy": publish_copy,
+}
+
+def publish_file(source_path, destination_path, strategy="copy"):
+    # Publish under a temp name and rename over the destination, so an existing
+    # file (possibly a hardlink into static/) is replaced and never written through
+    tmp_path = f"{destination_path}.{os.getpid()}.tmp"
+
+    while True:
+        try:
+            PUBLISH_FUNCTIONS[strategy](source_path, tmp_path)
+            os.replace(tmp_path, destination_path)
+            return strategy
+        except (OSError, AttributeError, ImportError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            strategy = PUBLISH_FALLBACKS[strategy]
+            if strategy is None:
+                raise
+
+class SyncReport:
+    def __init__(self):
+        self.copied = 0
+        self.bytes_copied = 0
+        self.skipped = 0
+        self.bytes_skipped = 0
+        self.deleted = 0
+        # strategy actually used (after fallbacks) -> number of files
+        self.strategies = {}
+        # logical path -> fingerprinted name, when fingerprinting
+        self.assets = {}
+
+    def __repr__(self):
+        return (
+            f"SyncReport(copied={self.copied}, bytes_copied={self.bytes_copied}, "
+            f"skipped={self.skipped}, bytes_skipped={self.bytes_skipped}, deleted={self.deleted})"
+        )
+
+def files_match(source_path, destination_path, source_stat, compare_hash, previous_entry=None, entry=None):
+    try:
+        destination_stat = os.stat(destination_path)
+    except FileNotFoundError:
+        return False
+
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+
+    # copy2 preserves mtime, so an identical mtime means we published this exact file
+    if destination_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        return True
+
+    # Same bytes with a different mtime (e.g. a fresh checkout) are remembered in the
+    # manifest rather than realigned with utime, which would also touch a hardlinked source
+    verified = [source_stat.st_mtime_ns, destination_stat.st_mtime_ns]
+    if (previous_entry is not None and previous_entry.get("verified") == verified) or (
+            compare_hash and hash_file(source_path) == hash_file(destination_path)):
+        if entry is not None:
+            entry["verified"] = verified
+        return True
+
+    return False
+
+def files_equal(path_a, path_b, chunk_size=1024 * 1024):
+    with open(path_a, 'rb') as file_a, open(path_b, 'rb') as file_b:
+        if os.fstat(file_a.fileno()).st_size != os.fstat(file_b.fileno()).st_size:
+            return False
+        while True:
+            chunk = file_a.read(chunk_size)
+            if chunk != file_b.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+def replace_if_changed(tmp_path, destination_path):
+    # Identical output keeps the old file and its mtime, so deploys and CDN syncs skip it
+    try:
+        if files_equal(tmp_path, destination_path):
+            os.remove(tmp_path)
+            return False
+    except FileNotFoundError:
+        pass
+    os.replace(tmp_path, destination_path)
+    return True
+
+def remove_empty_parents(path, root):
+    parent = os.path.dirname(path)
+    root = os.path.abspath(root)
+    while os.path.abspath(parent).startswith(root + os.sep) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+def fingerprinted_name(relative_path, digest):
+    # images/tom.png -> images/tom.1a2b3c4d5e.png
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+def source_digest(source_path, source_stat, previous_entry):
+    # Reuse the last build's hash while size and mtime are unchanged
+    if (previous_entry is not None and "hash" in previous_entry
+            and previous_entry.get("size") == source_stat.st_size
+            and previous_entry.get("mtime_ns") == source_stat.st_mtime_ns):
+        return previous_entry["hash"]
+    return hash_file(source_path)
+
+def sync_folder(source_folder, destination_folder, manifest_path, compare_hash=False, strategy="copy", skip=None,
+                fingerprint=False, file_index=None):
+    report = SyncReport()
+    os.makedirs(destination_folder, exist_ok=True)
+
+    # The manifest remembers what we published, so orphans can be removed without
+    # touching files that other build stages write into the same destination
+    previous = load_manifest(manifest_path, "files")["files"]
+    manifest = empty_manifest("files")
+
+    for source in scan_tree(source_folder, index=file_index):
+        relative_path = source.relative_path
+        # Files another stage publishes (e.g. minified CSS) are neither copied nor treated as orphans
+        if skip is not None and skip(relative_path):
+            continue
+        source_path = source.path
+        # Stat cached by the scan; nothing below stats the source again
+        source_stat = source.stat
+        entry = {"size": source_stat.st_size}
+
+        output_path = relative_path
+        if fingerprint:
+            digest = source_digest(source_path, source_stat, previous.get(relative_path))
+            output_path = fingerprinted_name(relative_path, digest)
+            entry.update(mtime_ns=source_stat.st_mtime_ns, hash=digest, output=output_path)
+            report.assets[relative_path.replace(os.sep, "/")] = output_path.replace(os.sep, "/")
+        destination_path = os.path.join(destination_folder, output_path)
+
+        if files_match(source_path, destination_path, source_stat, compare_hash, previous.get(relative_path), entry):
+            report.skipped += 1
+            report.bytes_skipped += source_stat.st_size
+        else:
+            os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+            used = publish_file(source_path, destination_path, strategy)
+            report.strategies[used] = report.strategies.get(used, 0) + 1
+            report.copied += 1
+            report.bytes_copied += source_stat.st_size
+
+        manifest["files"][relative_path] = entry
+
+    # Turning fingerprinting on or off renames every output, so orphans are matched by output path
+    live_outputs = {entry.get("output", relative_path) for relative_path, entry in manifest["files"].items()}
+    for relative_path, entry in previous.items():
+        output_path = entry.get("output", relative_path)
+        if output_path in live_outputs or (skip is not None and skip(relative_path)):
+            continue
+
+        destination_path = os.path.join(destination_folder, output_path)
+        if os.path.isfile(destination_path):
+            os.remove(destination_path)
+            remove_empty_parents(destination_path, destination_folder)
+            report.deleted += 1
+
+    save_manifest(manifest_path, manifest)
+    return report
+
+def write_asset_manifest(destination_folder, assets):
+    # Published with the site so the server and CDN can map logical names to hashed ones
+    manifest_path = os.path.join(destination_folder, ASSET_MANIFEST_NAME)
+    if assets is None:
+        if os.path.isfile(manifest_path):
+            os.remove(manifest_path)
+        return
+    if os.path.isfile(manifest_path) and load_manifest(manifest_path, "assets")["assets"] == assets:
+        return
+    save_manifest(manifest_path, {"version": MANIFEST_VERSION, "assets": assets})
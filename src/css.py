@@ -0,0 +1,245 @@
+import os
+import re
+from copystatic import remove_empty_parents, fingerprinted_name
+from discovery import scan_tree
+from manifest import load_manifest, save_manifest, empty_manifest, hash_bytes
+
+CSS_TOKEN_PATTERN = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')'  # strings are kept verbatim
+    r'|(/\*.*?\*/)'                              # comments
+    r'|(\s+)'                                    # whitespace
+    r'|([{};,>:()])'                             # punctuation that needs no surrounding space
+    r'|([^\s"\'{};,>:()/]+|/)',
+    re.DOTALL,
+)
+NO_SPACE_AFTER = frozenset("{};,>:(")
+NO_SPACE_BEFORE = frozenset("{};,>)")
+
+# Element names start a compound selector: "pre code", "ul>li", "a:hover"
+ELEMENT_PATTERN = re.compile(r"(?:^|[\s>+~])([a-zA-Z][\w-]*)")
+HTML_TAG_PATTERN = re.compile(r"<([a-zA-Z][\w-]*)")
+LINK_PATTERN = re.compile(r"<link\b[^>]*>")
+HREF_PATTERN = re.compile(r'\bhref="/([^"]+)"')
+CSS_URL_PATTERN = re.compile(r'url\((["\']?)/([^"\')]+)\1\)')
+
+def minify_css(css):
+    pieces = []
+    pending_space = False
+    for string, comment, space, punctuation, word in CSS_TOKEN_PATTERN.findall(css):
+        if comment or space:
+            pending_space = True
+            continue
+
+        text = string or punctuation or word
+        if pending_space and pieces and pieces[-1][-1] not in NO_SPACE_AFTER and text[0] not in NO_SPACE_BEFORE:
+            pieces.append(" ")
+        pending_space = False
+
+        # The last declaration in a block needs no semicolon
+        if text == "}" and pieces and pieces[-1] == ";":
+            pieces.pop()
+        pieces.append(text)
+    return "".join(pieces)
+
+def split_rules(css):
+    # Top-level rules of minified CSS; at-rules keep their nested blocks
+    rules = []
+    depth = 0
+    start = 0
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != "\\":
+                quote = None
+        elif char == '"' or char == "'":
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:i + 1])
+                start = i + 1
+        elif char == ";" and depth == 0:
+            rules.append(css[start:i + 1])
+            start = i + 1
+    return rules
+
+def rule_requirements(rule):
+    # Element names each selector of the rule needs, or None if the rule always applies
+    if rule.startswith("@"):
+        return None
+    selector = rule[:rule.find("{")]
+    if "(" in selector:
+        # :is()/:not() lists are too easy to misread; keep the rule
+        return None
+    return [
+        frozenset(name.lower() for name in ELEMENT_PATTERN.findall(part.strip()))
+        for part in selector.split(",")
+    ]
+
+def collect_tags(node):
+    tags = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag is not None:
+            tags.add(node.tag)
+        if node.children:
+            stack.extend(node.children)
+    return tags
+
+def html_tags(html):
+    return {name.lower() for name in HTML_TAG_PATTERN.findall(html)}
+
+class Stylesheet:
+    def __init__(self, css):
+        self.minified = minify_css(css)
+        self.digest = hash_bytes(self.minified.encode('utf-8'))
+        self.rules = [(rule_requirements(rule), rule) for rule in split_rules(self.minified)]
+
+    def critical_for(self, tags):
+        return "".join(
+            rule for requirements, rule in self.rules
+            if requirements is None or any(required <= tags for required in requirements)
+        )
+
+class CriticalStyles:
+    def __init__(self, stylesheets, template_tags):
+        self.stylesheets = stylesheets
+        self.template_tags = frozenset(template_tags)
+        self.digest = hash_bytes("".join(sheet.digest for sheet in stylesheets).encode('utf-8'))
+        # Most pages of a site use one of a handful of tag sets
+        self.cache = {}
+
+    def for_content(self, content, tags=None):
+        # Streamed content can't be scanned before the head is written, so it gets every rule
+        if tags is None:
+            if not isinstance(content, str):
+                return "".join(sheet.minified for sheet in self.stylesheets)
+            tags = html_tags(content)
+
+        key = self.template_tags.union(tags)
+        critical = self.cache.get(key)
+        if critical is None:
+            critical = "".join(sheet.critical_for(key) for sheet in self.stylesheets)
+            self.cache[key] = critical
+        return critical
+
+def defer_stylesheets(template_content, stylesheets):
+    # Swaps render-blocking <link>s to known stylesheets for an inline {{ CriticalCSS }} slot
+    # and a preload that applies the full sheet once it arrives
+    linked = []
+
+    def replace(match):
+        link = match.group(0)
+        href = HREF_PATTERN.search(link)
+        if 'rel="stylesheet"' not in link or href is None or href.group(1) not in stylesheets:
+            return link
+        path = href.group(1)
+        slot = "" if linked else "<style>{{ CriticalCSS }}</style>"
+        linked.append(stylesheets[path])
+        return (
+            f'{slot}<link rel="preload" href="/{path}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'" />'
+            f"<noscript>{link}</noscript>"
+        )
+
+    template_content = LINK_PATTERN.sub(replace, template_content)
+    if not linked:
+        return template_content, None
+    return template_content, CriticalStyles(linked, html_tags(template_content))
+
+class CssReport:
+    def __init__(self):
+        self.minified = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __repr__(self):
+        return (
+            f"CssReport(minified={self.minified}, unchanged={self.unchanged}, removed={self.removed}, "
+            f"bytes_in={self.bytes_in}, bytes_out={self.bytes_out})"
+        )
+
+class CssPipeline:
+    def __init__(self, source_folder, destination_folder, manifest_path):
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.manifest_path = manifest_path
+        # Relative URL path ("index.css") -> Stylesheet, filled by build()
+        self.stylesheets = {}
+        # Relative URL path -> fingerprinted name, when fingerprinting
+        self.assets = {}
+
+    def handles(self, relative_path):
+        return relative_path.endswith(".css")
+
+    def build(self, fingerprint=False, assets=None, file_index=None):
+        report = CssReport()
+        previous = load_manifest(self.manifest_path, "css")["css"]
+        manifest = empty_manifest("css")
+        self.stylesheets = {}
+        self.assets = {}
+
+        for source in scan_tree(self.source_folder, index=file_index):
+            relative_path = source.relative_path
+            if not self.handles(relative_path):
+                continue
+
+            with open(source.path, 'r', encoding='utf-8') as css_file:
+                css = css_file.read()
+            if assets:
+                # Site-relative url()s follow their assets to the fingerprinted names
+                css = CSS_URL_PATTERN.sub(
+                    lambda match: f"url({match.group(1)}/{assets.get(match.group(2), match.group(2))}{match.group(1)})", css
+                )
+            # Minified once per build, then shared by the output file and every page
+            stylesheet = Stylesheet(css)
+            self.stylesheets[relative_path.replace(os.sep, "/")] = stylesheet
+            report.bytes_in += len(css.encode('utf-8'))
+            report.bytes_out += len(stylesheet.minified.encode('utf-8'))
+
+            output_path = relative_path
+            if fingerprint:
+                output_path = fingerprinted_name(relative_path, stylesheet.digest)
+                self.assets[relative_path.replace(os.sep, "/")] = output_path.replace(os.sep, "/")
+
+            if self.write_if_changed(output_path, stylesheet.minified):
+                report.minified += 1
+            else:
+                report.unchanged += 1
+            manifest["css"][relative_path] = {"hash": stylesheet.digest, "output": output_path}
+
+        live_outputs = {entry["output"] for entry in manifest["css"].values()}
+        for relative_path, entry in previous.items():
+            output_path = entry.get("output", relative_path)
+            if output_path in live_outputs:
+                continue
+            destination_path = os.path.join(self.destination_folder, output_path)
+            if os.path.isfile(destination_path):
+                os.remove(destination_path)
+                remove_empty_parents(destination_path, self.destination_folder)
+                report.removed += 1
+
+        save_manifest(self.manifest_path, manifest)
+        return report
+
+    def write_if_changed(self, relative_path, text):
+        destination_path = os.path.join(self.destination_folder, relative_path)
+        data = text.encode('utf-8')
+        try:
+            with open(destination_path, 'rb') as existing:
+                if existing.read() == data:
+                    return False
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        # The old file may be a hardlink into ./static, so never write through it
+        tmp_path = destination_path + ".tmp"
+        with open(tmp_path, 'wb') as output_file:
+            output_file.write(data)
+        os.replace(tmp_path, destination_path)
+        return True
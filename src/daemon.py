@@ -0,0 +1,110 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import time
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    # One JSON request per line, one JSON response per line
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            command = request.get("command") if isinstance(request, dict) else None
+        except ValueError:
+            command = None
+
+        if command == "build":
+            response = self.server.run_build()
+        elif command == "ping":
+            response = {"status": 0, "builds": self.server.builds}
+        elif command == "shutdown":
+            self.server.stopping = True
+            response = {"status": 0}
+        else:
+            response = {"status": 2, "error": "unknown request, expected build, ping or shutdown"}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+
+class BuildDaemon(socketserver.UnixStreamServer):
+    # Requests are handled one at a time, so builds never overlap
+    def __init__(self, socket_path, builder):
+        self.builder = builder
+        self.builds = 0
+        self.stopping = False
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, BuildRequestHandler)
+        # Only the owner may trigger builds
+        os.chmod(socket_path, 0o600)
+
+    def run_build(self):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            try:
+                status = self.builder.build()
+            except Exception as e:
+                # The daemon outlives a broken build; the next request starts over
+                print(f"ERROR: {e}")
+                status = 1
+        self.builds += 1
+        return {"status": status, "seconds": round(time.perf_counter() - start, 3), "output": output.getvalue()}
+
+    def run(self):
+        while not self.stopping:
+            self.handle_request()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+def remove_stale_socket(socket_path):
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        return  # Not ours; bind reports it
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            # Left behind by a daemon that didn't shut down cleanly
+            os.remove(socket_path)
+            return
+    raise OSError(f"a build daemon is already listening on {socket_path}")
+
+def send_request(socket_path, command="build", timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall(json.dumps({"command": command}).encode('utf-8') + b"\n")
+        with client.makefile('rb') as response_file:
+            return json.loads(response_file.readline())
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Send a request to a running build daemon (main.py --daemon)")
+    parser.add_argument("socket", help="path of the daemon's Unix socket")
+    parser.add_argument("command", nargs="?", default="build", choices=("build", "ping", "shutdown"))
+    parser.add_argument("--timeout", type=float, default=None, help="seconds to wait for the response")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    response = send_request(args.socket, args.command, args.timeout)
+    if "output" in response:
+        print(response["output"], end="")
+        print(f"Build finished in {response['seconds']}s with status {response['status']}")
+    elif "error" in response:
+        print(f"ERROR: {response['error']}")
+    elif args.command == "ping":
+        print(f"Build daemon on {args.socket} is up, {response['builds']} builds served")
+    return response["status"]
+
+if __name__ == "__main__":
+    sys.exit(main())
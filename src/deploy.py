@@ -0,0 +1,58 @@
+import os
+from discovery import scan_tree
+from manifest import load_manifest, save_manifest, empty_manifest, hash_file, MANIFEST_VERSION
+
+class DeployReport:
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.deleted = []
+        self.unchanged = 0
+
+    def to_dict(self):
+        return {
+            "version": MANIFEST_VERSION,
+            "added": self.added,
+            "changed": self.changed,
+            "deleted": self.deleted,
+        }
+
+    def __repr__(self):
+        return (
+            f"DeployReport(added={len(self.added)}, changed={len(self.changed)}, "
+            f"deleted={len(self.deleted)}, unchanged={self.unchanged})"
+        )
+
+def diff_outputs(root, manifest_path):
+    # Compares the finished output tree with the one recorded by the previous build.
+    # Paths use "/" so the result can be handed straight to an uploader
+    report = DeployReport()
+    previous = load_manifest(manifest_path, "outputs")["outputs"]
+    manifest = empty_manifest("outputs")
+
+    for output in scan_tree(root):
+        relative_path = output.relative_path.replace(os.sep, "/")
+        stat = output.stat
+        old_entry = previous.get(relative_path)
+
+        # Outputs are only rewritten when their bytes change, so a matching stat means a matching hash
+        if (old_entry is not None and old_entry.get("size") == stat.st_size
+                and old_entry.get("mtime_ns") == stat.st_mtime_ns):
+            digest = old_entry["hash"]
+        else:
+            digest = hash_file(output.path)
+        manifest["outputs"][relative_path] = {"hash": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        if old_entry is None:
+            report.added.append(relative_path)
+        elif old_entry.get("hash") != digest:
+            report.changed.append(relative_path)
+        else:
+            report.unchanged += 1
+
+    report.deleted = sorted(set(previous) - set(manifest["outputs"]))
+    save_manifest(manifest_path, manifest)
+    return report
+
+def write_deploy_manifest(path, report):
+    save_manifest(path, report.to_dict())
@@ -0,0 +1,80 @@
+import os
+import time
+
+# A listing taken this soon after its directory changed may have missed a change made in
+# the same timestamp tick, so it isn't reused
+RACY_WINDOW_NS = 1_000_000_000
+
+class FileEntry:
+    # One discovered file; stat is the DirEntry's cached result, so callers never stat again
+    __slots__ = ("path", "relative_path", "stat")
+
+    def __init__(self, path, relative_path, stat):
+        self.path = path
+        self.relative_path = relative_path
+        self.stat = stat
+
+    def __repr__(self):
+        return f"FileEntry({self.relative_path}, {self.stat.st_size} bytes)"
+
+def read_folder(folder):
+    # (name, is_dir, is_file, DirEntry) in name order
+    with os.scandir(folder) as iterator:
+        return sorted(
+            ((entry.name, entry.is_dir(), entry.is_file(), entry) for entry in iterator),
+            key=lambda item: item[0],
+        )
+
+class FileIndex:
+    # Directory listings kept in memory between builds of a long-lived process. A directory
+    # whose mtime hasn't moved still holds the same names, so only its files are stat'ed again
+    def __init__(self):
+        self.listings = {}
+        self.hits = 0
+        self.misses = 0
+
+    def read_folder(self, folder):
+        mtime_ns = os.stat(folder).st_mtime_ns
+        cached = self.listings.get(folder)
+        if cached is not None and cached[0] == mtime_ns:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        listed_at = time.time_ns()
+        items = read_folder(folder)
+        if listed_at - mtime_ns > RACY_WINDOW_NS:
+            # DirEntry caches its stat, so only the names and types are kept
+            self.listings[folder] = (mtime_ns, [(name, is_dir, is_file, None) for name, is_dir, is_file, _ in items])
+        else:
+            self.listings.pop(folder, None)
+        return items
+
+def scan_tree(root, suffix=None, skip_hidden=False, index=None):
+    # Files under root in sorted name order, subfolders visited where they sort, so every
+    # filesystem yields the same list. scandir's d_type answers is_file/is_dir without a
+    # syscall, leaving one stat per file and none per directory
+    files = []
+    scan_folder(root, "", suffix, skip_hidden, index, files)
+    return files
+
+def scan_folder(folder, prefix, suffix, skip_hidden, index, files):
+    items = read_folder(folder) if index is None else index.read_folder(folder)
+
+    for name, is_dir, is_file, entry in items:
+        if skip_hidden and name.startswith('.'):
+            continue
+        path = os.path.join(folder, name)
+        relative_path = os.path.join(prefix, name)
+        if is_dir:
+            scan_folder(path, relative_path, suffix, skip_hidden, index, files)
+        elif is_file and (suffix is None or name.endswith(suffix)):
+            if entry is not None:
+                stat = entry.stat()
+            else:
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # Removed after its directory was checked; the next scan won't list it
+                    continue
+            files.append(FileEntry(path, relative_path, stat))
@@ -1,21 +1,35 @@
+# Attributes holding site-relative URLs that get the basepath prefix
+URL_ATTRIBUTES = ("href", "src")
+
+def rewrite_url(url, url_prefix, assets=None):
+    # "/images/a.png" -> basepath + the asset's published (possibly fingerprinted) name
+    path = url[1:]
+    if assets:
+        path = assets.get(path, path)
+    return url_prefix + path
 
 class HTMLNode():
+    # A site produces millions of nodes per build, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, url_prefix=None, assets=None):
         raise NotImplementedError("child class will override")
 
-    def props_to_html(self):
+    def props_to_html(self, url_prefix=None, assets=None):
         if self.props is None:
             return ""
         
         html_props = ""
         
         for k,v in self.props.items():
+            if url_prefix is not None and k in URL_ATTRIBUTES and v.startswith("/"):
+                v = rewrite_url(v, url_prefix, assets)
             html_props += f' {k}="{v}"'
 
         return html_props
@@ -24,10 +38,9 @@ class HTMLNode():
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
 
 class LeafNode(HTMLNode):
-    def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, None, props)
-        self.children = None
-    
+    __slots__ = ()
+
+    # Shadows the children slot, so a leaf stores no children at all
     @property
     def children(self):
         return None
@@ -36,50 +49,74 @@ class LeafNode(HTMLNode):
     def children(self, value):
         if value is not None:
             raise AttributeError("LeafNode cannot have children.")
+
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.props = props
     
-    def to_html(self):
+    def to_html(self, url_prefix=None, assets=None):
 
         if self.value is None:
             # Handle self-closing tags
-            props_string = self.props_to_html() if self.props else ""
+            props_string = self.props_to_html(url_prefix, assets) if self.props else ""
             return f'<{self.tag}{props_string}>'
         
         if not self.tag:
             return self.value
 
-        props_string = self.props_to_html() if self.props else ""
-        html_results = f'<{self.tag}{props_string}>{self.value}</{self.tag}>'.strip()
-        return html_results
+        props_string = self.props_to_html(url_prefix, assets) if self.props else ""
+        return f'<{self.tag}{props_string}>{self.value}</{self.tag}>'
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
     
-    def to_html(self):
+    def to_html(self, url_prefix=None, assets=None):
+        parts = []
+        write_html(self, parts.append, url_prefix, assets)
+        return "".join(parts)
+
+    def open_tag(self, url_prefix=None, assets=None):
         if not self.tag:
             raise ValueError("ParentNode must have a tag")
 
         if not self.children:
             raise ValueError("ParentNode must have children")
-        
-        props_string = self.props_to_html() if self.props else ""
-
-        # opening tag
-        result = f"<{self.tag}{props_string}>"
 
-        # process children
         for child in self.children:
             if not isinstance(child, HTMLNode):
                 raise TypeError("Children must be HTMLNode objects")
-            result += child.to_html()
-
-        # closing tag
-        result += f"</{self.tag}>"
 
-        return result
+        props_string = self.props_to_html(url_prefix, assets) if self.props else ""
+        return f"<{self.tag}{props_string}>"
         
     def __repr__(self):
-        return f"ParentNode({self.tag}, {self.children}, {self.props})"
\ No newline at end of file
+        return f"ParentNode({self.tag}, {self.children}, {self.props})"
+
+def write_html(node, writer, url_prefix=None, assets=None):
+    # Accept a file-like object or a plain callable such as list.append
+    write = writer.write if hasattr(writer, "write") else writer
+
+    if not isinstance(node, HTMLNode):
+        raise TypeError("Children must be HTMLNode objects")
+
+    # Explicit stack instead of recursion: nodes still to visit, plus the closing
+    # tags (plain strings) of parents whose children are being written
+    stack = [node]
+    while stack:
+        item = stack.pop()
+
+        if isinstance(item, str):
+            write(item)
+        elif isinstance(item, ParentNode):
+            write(item.open_tag(url_prefix, assets))
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        else:
+            write(item.to_html(url_prefix, assets))
@@ -110,34 +110,65 @@ def split_nodes_link(old_nodes):
         
     return results
 
+# Anything that can open a span; text without any of these is plain
+INLINE_MARKUP_PATTERN = re.compile(r"\*\*|[_`\[]|!\[")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+DELIMITER_TYPES = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
 def text_to_textnodes(text):
-    # First split into bold nodes
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    
-    # Only process non-bold nodes for other delimiters
-    result = []
-    for node in nodes:
-        if node.text_type == TextType.BOLD:
-            # Don't process bold nodes any further
-            result.append(node)
+    # Single left-to-right scan: each span is found where it opens, so there is
+    # one pass over the text however many spans (of any kind) it holds
+    match = INLINE_MARKUP_PATTERN.search(text)
+    if match is None:
+        return [TextNode(text, TextType.TEXT)]
+
+    nodes = []
+    text_start = 0
+    closed = set()
+
+    while match is not None:
+        token = match.group()
+        start = match.start()
+        span = None
+
+        if token in DELIMITER_TYPES:
+            end = text.find(token, start + len(token))
+            if end != -1:
+                span = TextNode(text[start + len(token):end], DELIMITER_TYPES[token])
+                next_start = end + len(token)
+                closed.add(token)
+            elif token in closed:
+                # A stray delimiter after a closed pair stays literal, as the chained splitters left it
+                next_start = start + len(token)
+            else:
+                raise Exception("second delimiter not found")
         else:
-            # Process other delimiters only for text nodes
-            current = [node]
-            current = split_nodes_delimiter(current, "_", TextType.ITALIC)
-            current = split_nodes_delimiter(current, "`", TextType.CODE)
-            
-            # Handle images and links
-            for n in current:
-                if n.text_type != TextType.TEXT:
-                    result.append(n)
-                    continue
-                    
-                image_nodes = split_nodes_image(n)
-                for img_node in image_nodes:
-                    if img_node.text_type == TextType.TEXT:
-                        result.extend(split_nodes_link(img_node))
-                    else:
-                        result.append(img_node)
-                        
-    return result
\ No newline at end of file
+            pattern = IMAGE_PATTERN if token == "![" else LINK_PATTERN
+            span_match = pattern.match(text, start)
+            if span_match is not None:
+                text_type = TextType.IMAGE if token == "![" else TextType.LINK
+                span = TextNode(span_match.group(1), text_type, span_match.group(2))
+                next_start = span_match.end()
+            else:
+                # Not a real image or link, so the bracket stays literal text
+                next_start = start + len(token)
+
+        if span is not None:
+            if start > text_start:
+                nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+            nodes.append(span)
+            text_start = next_start
+
+        match = INLINE_MARKUP_PATTERN.search(text, next_start)
+
+    if not nodes:
+        return [TextNode(text, TextType.TEXT)]
+
+    # Trailing text is always emitted, even when empty
+    nodes.append(TextNode(text[text_start:], TextType.TEXT))
+    return nodes
@@ -1,49 +1,144 @@
-from copystatic import delete_directory_contents, copy_folder_recursive
-from textnode import TextNode, TextType
-from page_generator import generate_page, generate_pages_recursive
+from builder import BuildConfig, SiteBuilder
+from copystatic import PUBLISH_STRATEGIES
+from daemon import BuildDaemon
+from profiler import BuildProfiler, NULL_PROFILER
+from serve import make_server
+from shard import parse_shard
+from watcher import SiteWatcher
+import argparse
+import cProfile
 import os
 import sys
+import threading
 
-def main():
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    else:
-        basepath ="/"
-    
-    source_folder = "./static"
-    #destination_folder = "./public"
-    destination_folder = "./docs"
-    
-    delete_directory_contents(destination_folder)
-    copy_folder_recursive(source_folder, destination_folder)
-    
-    #markdown_file = "content/index.md"
-    #template_file = "template.html"
-    #destination_file = "public/index.html"
-    
-    #generate_page('content/index.md', 'template.html', 'public/index.html')
-    #generate_page(markdown_file, template_file, destination_file)
-
-    # Print current working directory
-    current_dir = os.getcwd()
-    print(f"Current working directory: {current_dir}")
-    
-    # Use absolute paths
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    content_dir = os.path.abspath(os.path.join(script_dir, '..', 'content'))
-    template_path = os.path.abspath(os.path.join(script_dir, '..', 'template.html'))
-    public_dir = os.path.abspath(os.path.join(script_dir, '..', 'docs'))
-    
-    print(f"Content directory: {content_dir}")
-    print(f"Template path: {template_path}")
-    print(f"Public directory: {public_dir}")
-    
-    # Check if content directory exists
-    if not os.path.exists(content_dir):
-        print(f"ERROR: Content directory does not exist: {content_dir}")
-        return
-        
-    # Generate pages
-    generate_pages_recursive(content_dir, template_path, public_dir, basepath)
-
-main()
\ No newline at end of file
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix for site-relative links")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="number of processes used to render pages")
+    parser.add_argument("--publish", choices=PUBLISH_STRATEGIES, default="reflink",
+                        help="how static files are published; unsupported strategies fall back towards a plain copy")
+    parser.add_argument("--minify", action="store_true", help="collapse insignificant whitespace in the HTML output")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="publish assets under content-hashed names and rewrite references to them")
+    parser.add_argument("--critical-css", action="store_true",
+                        help="inline the CSS rules each page uses and load the full stylesheet without blocking")
+    parser.add_argument("--precompress", action="store_true", help="write .gz siblings for compressible outputs")
+    parser.add_argument("--in-place", action="store_true",
+                        help="write straight into ./docs instead of staging the build and swapping it in")
+    parser.add_argument("--deploy-manifest", metavar="PATH",
+                        help="where to write the added/changed/deleted output paths (default .build-cache/deploy.json)")
+    parser.add_argument("--shard", type=shard_argument, metavar="I/N",
+                        help="build only the pages assigned to shard I of N; combine the outputs with --merge")
+    parser.add_argument("--merge", nargs="+", metavar="SHARD_DIR",
+                        help="instead of building, merge the output directories of every shard into ./docs")
+    parser.add_argument("--daemon", metavar="SOCKET",
+                        help="after building, stay up and rebuild on requests to this Unix socket (see daemon.py)")
+    parser.add_argument("--watch", action="store_true", help="after building, rebuild whatever changes until interrupted")
+    parser.add_argument("--serve", action="store_true", help="after building, serve ./docs for local preview")
+    parser.add_argument("--port", type=int, default=8888, help="port used by --serve")
+    parser.add_argument("--profile", action="store_true", help="report wall/CPU time per stage and page, and peak memory")
+    parser.add_argument("--profile-top", type=int, default=10, help="how many of the slowest stages and pages to list")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write the full profile as JSON")
+    parser.add_argument("--profile-cprofile", metavar="PATH", help="also write a cProfile dump of the build")
+    args = parser.parse_args(argv)
+    if args.fingerprint and args.watch:
+        # The watcher publishes edits in place under their plain names
+        parser.error("--fingerprint can't be combined with --watch")
+    if (args.shard or args.merge) and args.watch:
+        parser.error("--shard and --merge can't be combined with --watch")
+    if args.daemon and args.watch:
+        parser.error("--daemon can't be combined with --watch")
+    if args.shard and args.merge:
+        parser.error("--shard and --merge can't be combined")
+    return args
+
+def shard_argument(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if not (args.profile or args.profile_json or args.profile_cprofile):
+        return build(args, NULL_PROFILER)
+
+    profiler = BuildProfiler()
+    profiler.start()
+    cprofile = cProfile.Profile() if args.profile_cprofile else None
+    if cprofile:
+        cprofile.enable()
+
+    try:
+        status = build(args, profiler)
+    finally:
+        if cprofile:
+            cprofile.disable()
+            cprofile.dump_stats(args.profile_cprofile)
+        profiler.stop()
+
+    print(profiler.report(args.profile_top))
+    if args.profile_json:
+        profiler.write_json(args.profile_json)
+    return status
+
+def config_from_args(args):
+    return BuildConfig(
+        basepath=args.basepath,
+        jobs=args.jobs,
+        publish=args.publish,
+        minify=args.minify,
+        fingerprint=args.fingerprint,
+        critical_css=args.critical_css,
+        precompress=args.precompress,
+        in_place=args.in_place,
+        deploy_manifest=args.deploy_manifest,
+        shard=args.shard,
+        merge=args.merge,
+    )
+
+def build(args, profiler):
+    print(f"Current working directory: {os.getcwd()}")
+    config = config_from_args(args)
+    builder = SiteBuilder(config)
+    status = builder.build(profiler)
+
+    if status != 0 and not (args.watch or args.daemon):
+        return status
+
+    server = None
+    if args.serve:
+        server = make_server(config.output_dir, config.basepath, port=args.port, cache_dir=config.cache_dir)
+        print(f"Serving {config.output_dir} at http://127.0.0.1:{server.server_address[1]}{config.basepath}")
+
+    try:
+        if args.watch or args.daemon:
+            if server:
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+        if args.watch:
+            watcher = SiteWatcher(config.content_dir, config.static_dir, config.template_path,
+                                  config.output_dir, config.basepath, minify=config.minify,
+                                  css=builder.css, critical_css=config.critical_css,
+                                  body_cache=builder.body_cache, strategy=config.publish)
+            watcher.run()
+        elif args.daemon:
+            # The first build above warmed the builder; every request reuses it
+            daemon = BuildDaemon(args.daemon, builder)
+            print(f"Build daemon listening on {args.daemon}")
+            try:
+                daemon.run()
+            finally:
+                daemon.server_close()
+        elif server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server:
+            server.server_close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def empty_manifest(section="pages"):
+    return {"version": MANIFEST_VERSION, section: {}}
+
+def load_manifest(manifest_path, section="pages"):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return empty_manifest(section)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return empty_manifest(section)
+
+    # A manifest from another version can't be trusted, start over
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest(section)
+
+    manifest.setdefault(section, {})
+    return manifest
+
+def save_manifest(manifest_path, manifest):
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    # Write to a temp file first so an interrupted build never leaves a half-written manifest
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
@@ -0,0 +1,173 @@
+import re
+
+# Only ASCII whitespace collapses in HTML; &nbsp; and other unicode spaces are content
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+TAG_NAME_PATTERN = re.compile(r"</?([A-Za-z][\w-]*|!doctype)", re.IGNORECASE)
+
+# Whitespace next to these never renders, so it can go entirely
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "script", "style",
+    "article", "aside", "blockquote", "div", "footer", "header", "hr", "li", "main", "nav", "ol",
+    "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+))
+
+# Contents are written exactly as they come; code blocks render as <pre><code>
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+TEXT, TAG, RAW = range(3)
+
+class MinifyWriter:
+    # Streaming filter: chunks may split text, tags or preserved blocks anywhere
+    def __init__(self, writer):
+        self.out = writer.write if hasattr(writer, "write") else writer
+        self.state = TEXT
+        self.tag = []
+        self.quote = None
+        self.bang = None
+        self.raw_end = None
+        self.carry = ""
+        self.pending_space = False
+        # Leading whitespace of the document is dropped like whitespace after a block tag
+        self.after_block = True
+        self.chars_in = 0
+        self.chars_out = 0
+
+    @property
+    def saved(self):
+        # Only ASCII whitespace is ever removed, so characters saved equal bytes saved
+        return self.chars_in - self.chars_out
+
+    def emit(self, text):
+        if text:
+            self.chars_out += len(text)
+            self.out(text)
+
+    def emit_space(self, next_is_block):
+        if self.pending_space and not self.after_block and not next_is_block:
+            self.emit(" ")
+        self.pending_space = False
+
+    def write(self, chunk):
+        self.chars_in += len(chunk)
+        self.feed(chunk)
+
+    def feed(self, chunk):
+        pos = 0
+        while pos < len(chunk):
+            if self.state == TEXT:
+                start = chunk.find("<", pos)
+                if start < 0:
+                    self.text(chunk[pos:])
+                    return
+                self.text(chunk[pos:start])
+                self.state = TAG
+                self.tag = ["<"]
+                self.quote = None
+                self.bang = None
+                pos = start + 1
+            elif self.state == TAG:
+                pos = self.scan_tag(chunk, pos)
+            else:
+                self.scan_raw(chunk[pos:])
+                return
+
+    def text(self, text):
+        if not text:
+            return
+        text = WHITESPACE_PATTERN.sub(" ", text)
+        if text[0] == " ":
+            self.pending_space = True
+            text = text[1:]
+        if not text:
+            return
+        trailing_space = text[-1] == " "
+        if trailing_space:
+            text = text[:-1]
+        self.emit_space(False)
+        self.emit(text)
+        self.after_block = False
+        self.pending_space = trailing_space
+
+    def scan_tag(self, chunk, pos):
+        if self.bang is None:
+            # A "<" that can't start a tag (e.g. "a < b") is plain text
+            if not (chunk[pos].isalpha() or chunk[pos] in "/!"):
+                self.state = TEXT
+                self.text_lt()
+                return pos
+            # Doctypes and comments have no attributes, so quotes in them mean nothing
+            self.bang = chunk[pos] == "!"
+
+        for i in range(pos, len(chunk)):
+            char = chunk[i]
+            if self.quote:
+                if char == self.quote:
+                    self.quote = None
+            elif (char == '"' or char == "'") and not self.bang:
+                self.quote = char
+            elif char == ">":
+                self.tag.append(chunk[pos:i + 1])
+                tag_text = "".join(self.tag)
+                # Comments may contain ">" and only end at "-->"
+                if tag_text.startswith("<!--") and not tag_text.endswith("-->"):
+                    self.tag = [tag_text]
+                    pos = i + 1
+                    continue
+                self.finish_tag(tag_text)
+                return i + 1
+        self.tag.append(chunk[pos:])
+        return len(chunk)
+
+    def text_lt(self):
+        self.emit_space(False)
+        self.emit("<")
+        self.after_block = False
+
+    def finish_tag(self, tag_text):
+        match = TAG_NAME_PATTERN.match(tag_text)
+        name = match.group(1).lower() if match else None
+        is_block = name in BLOCK_TAGS
+        self.emit_space(is_block)
+        self.emit(tag_text)
+        self.after_block = is_block
+        self.tag = []
+
+        if name in PRESERVE_TAGS and not tag_text.startswith("</") and not tag_text.endswith("/>"):
+            self.state = RAW
+            self.raw_end = "</" + name
+            self.carry = ""
+        else:
+            self.state = TEXT
+
+    def scan_raw(self, chunk):
+        data = self.carry + chunk
+        end = data.lower().find(self.raw_end)
+        if end < 0:
+            # Hold back enough characters to spot a closing tag split across chunks
+            keep = len(self.raw_end) - 1
+            self.emit(data[:-keep])
+            self.carry = data[-keep:]
+            return
+
+        self.emit(data[:end])
+        self.carry = ""
+        self.raw_end = None
+        self.state = TEXT
+        self.feed(data[end:])
+
+    def close(self):
+        if self.state == TAG:
+            self.emit("".join(self.tag))
+        elif self.state == RAW:
+            self.emit(self.carry)
+        self.tag = []
+        self.carry = ""
+        self.state = TEXT
+        self.pending_space = False
+
+def render_minified(template, writer, **values):
+    minifier = MinifyWriter(writer)
+    template.render_to(minifier, **values)
+    minifier.close()
+    return minifier.saved
@@ -1,9 +1,26 @@
 import os
-from block_markdown import markdown_to_html_node
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from block_markdown import markdown_to_html_node, iter_blocks, block_to_html_nodes
+from htmlnode import write_html
+from copystatic import remove_empty_parents, replace_if_changed
+from css import collect_tags
+from discovery import scan_tree
+from minify import render_minified
+from manifest import load_manifest, save_manifest, empty_manifest, hash_file, hash_bytes
+from profiler import NULL_PROFILER, reset_traced_peak
+from shard import in_shard, write_shard_manifest
+from render_cache import markdown_to_cached_html, fill_url_prefix, URL_PREFIX_MARKER, RENDERER_VERSION
+from template import load_template
+
+# Sources at least this big are converted block by block instead of in memory
+STREAMING_THRESHOLD = 4 * 1024 * 1024
 
 def extract_title(markdown_string):
-    markdown_lines = markdown_string.splitlines()
+    return extract_title_from_lines(markdown_string.splitlines())
 
+def extract_title_from_lines(markdown_lines):
     for line in markdown_lines:
         if line.startswith('#') and not line.startswith('##'):
             title = line[1:].strip()
@@ -11,66 +28,361 @@ def extract_title(markdown_string):
     
     raise ValueError("No h1 header (line starting with '#') found in the markdown.")
 
-def generate_page(from_path, template_path, dest_path, basepath):
+class PageBuildError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{len(failures)} page(s) failed to build:"]
+        lines.extend(f"  {path}: {error}" for path, error in failures)
+        super().__init__("\n".join(lines))
+
+def write_document(template, output_file, minify, tags=None, **values):
+    # Returns how many bytes minification saved
+    if template.critical_styles is not None:
+        values["CriticalCSS"] = template.critical_styles.for_content(values["Content"], tags)
+    if minify:
+        return render_minified(template, output_file, **values)
+    template.render_to(output_file, **values)
+    return 0
+
+def write_output(dest_path, render):
+    # Rendered next to the destination and swapped in only if the bytes differ, so an
+    # unchanged page keeps its mtime and a failure never leaves a truncated page
     os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as output_file:
+            result = render(output_file)
+        replace_if_changed(tmp_path, dest_path)
+        return result
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def render_page(from_path, template, dest_path, block_cache=None, body_cache=None, minify=False):
+    if os.path.getsize(from_path) >= STREAMING_THRESHOLD:
+        return render_page_streaming(from_path, template, dest_path, minify)
     
-    with open(from_path, 'r', encoding='utf-8') as markdown_file:
-        markdown_content = markdown_file.read()
+    with open(from_path, 'rb') as markdown_file:
+        markdown_bytes = markdown_file.read()
+    markdown_content = markdown_bytes.decode('utf-8')
 
     title = extract_title(markdown_content)
 
-    markdown_node = markdown_to_html_node(markdown_content)
-    html_content = markdown_node.to_html()
+    if block_cache is None and body_cache is None:
+        markdown_node = markdown_to_html_node(markdown_content)
 
-    with open(template_path, 'r', encoding='utf-8') as template_file:
-        template_content = template_file.read()
-    
-        rendered_html = template_content.replace("{{ Title }}", title)
-        rendered_html = rendered_html.replace("{{ Content }}", html_content)
-        rendered_html = rendered_html.replace('href="/', f'href="{basepath}')
-        rendered_html = rendered_html.replace('src="/', f'src="{basepath}')
-    
-    with open(dest_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(rendered_html)
-    
+        # The body is serialized straight into the output file
+        return write_output(dest_path, lambda output_file: write_document(
+            template,
+            output_file,
+            minify,
+            collect_tags(markdown_node),
+            Title=title,
+            Content=lambda write: write_html(markdown_node, write, template.basepath, template.assets),
+        ))
+
+    # Rendered without a basepath so the body can be cached and reused as is
+    if block_cache is not None:
+        # Unchanged blocks come straight from the cache as rendered HTML
+        body = markdown_to_cached_html(markdown_content, block_cache, None)
+    else:
+        body = markdown_to_html_node(markdown_content).to_html(URL_PREFIX_MARKER)
+
+    if body_cache is not None:
+        body_cache.put(hash_bytes(markdown_bytes), title, body)
+
+    return write_page(template, title, body, dest_path, minify)
+
+def write_page(template, title, body, dest_path, minify=False):
+    content = fill_url_prefix(body, template.basepath, template.assets)
+    return write_output(dest_path, lambda output_file: write_document(template, output_file, minify, Title=title,
+                                                                      Content=content))
+
+def refill_page(source_hash, template, dest_path, body_cache, minify=False):
+    # Template or basepath changed but the markdown didn't: no parsing at all.
+    # Returns the bytes minification saved, or None without a cached body
+    cached = body_cache.get(source_hash)
+    if cached is None:
+        return None
+    title, body = cached
+    return write_page(template, title, body, dest_path, minify)
+
+def write_blocks(markdown_file, write, url_prefix, assets=None):
+    # Same document as markdown_to_html_node, but only one block is alive at a time.
+    # The exception is a ``` fence that never closes: it is only known to be unclosed at
+    # EOF, so everything after its opening line is held in memory until then
+    wrote_block = False
+    write("<div>")
+    for block in iter_blocks(markdown_file):
+        for node in block_to_html_nodes(block):
+            write_html(node, write, url_prefix, assets)
+            wrote_block = True
+    if not wrote_block:
+        raise ValueError("ParentNode must have children")
+    write("</div>")
+
+def render_page_streaming(from_path, template, dest_path, minify=False):
+    # The title slot comes before the content, so find it in a cheap first pass
+    with open(from_path, 'r', encoding='utf-8') as markdown_file:
+        title = extract_title_from_lines(markdown_file)
+
+    with open(from_path, 'r', encoding='utf-8') as markdown_file:
+        return write_output(dest_path, lambda output_file: write_document(
+            template,
+            output_file,
+            minify,
+            Title=title,
+            Content=lambda write: write_blocks(markdown_file, write, template.basepath, template.assets),
+        ))
+
+def generate_page(from_path, template_path, dest_path, basepath):
+    render_page(from_path, load_template(template_path, basepath), dest_path)
     print(f"Generated page from {from_path} to {dest_path} using {template_path}")
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def discover_pages(dir_path_content, dest_dir_path, file_index=None):
+    # Hidden files and directories are skipped; the stats come back with the listing.
+    # A folder that can't be listed fails the build; treating it as empty would
+    # prune the outputs of every page under it
+    entries = scan_tree(dir_path_content, suffix='.md', skip_hidden=True, index=file_index)
+
+    # Convert dir/filename.md to dir/filename.html under the destination
+    return [
+        (entry, os.path.join(dest_dir_path, os.path.splitext(entry.relative_path)[0] + '.html'))
+        for entry in entries
+    ]
+
+def find_markdown_files(dir_path_content, dest_dir_path):
+    return [(entry.path, html_path) for entry, html_path in discover_pages(dir_path_content, dest_dir_path)]
+
+def shard_key(entry):
+    return entry.relative_path.replace(os.sep, "/")
+
+def record_shard(dest_dir_path, shard, all_entries, entries, failures):
+    # Tells the merge step which pages this shard is responsible for and which it produced
+    if shard is None:
+        write_shard_manifest(dest_dir_path, None, None, None)
+        return
+    failed = {item_path for item_path, _ in failures}
+    pages = {
+        shard_key(entry): os.path.relpath(html_path, dest_dir_path).replace(os.sep, "/")
+        for entry, html_path in all_entries
+    }
+    built = [shard_key(entry) for entry, _ in entries if entry.path not in failed]
+    write_shard_manifest(dest_dir_path, shard, pages, built)
+
+def page_source_hash(entry, old_entry):
+    # An unchanged size and mtime means unchanged bytes, so the file isn't read again
+    if (old_entry is not None and "source_hash" in old_entry
+            and old_entry.get("size") == entry.stat.st_size
+            and old_entry.get("mtime_ns") == entry.stat.st_mtime_ns):
+        return old_entry["source_hash"]
+    return hash_file(entry.path)
+
+def page_is_current(entry, source_hash, template_hash, basepath, dest_path, minify=False):
+    if entry is None:
+        return False
+
+    return (
+        entry.get("source_hash") == source_hash
+        and entry.get("template_hash") == template_hash
+        and entry.get("basepath") == basepath
+        and entry.get("minify", False) == minify
+        and entry.get("renderer") == RENDERER_VERSION
+        and entry.get("output") == dest_path
+        and os.path.isfile(dest_path)
+    )
+
+def prune_outputs(stale_entries, dest_dir_path):
+    for entry in stale_entries:
+        output_path = entry.get("output")
+        if not output_path or not os.path.isfile(output_path):
+            continue
+
+        print(f"Removing output of deleted page: {output_path}")
+        os.remove(output_path)
+        remove_empty_parents(output_path, dest_dir_path)
+
+# Set once per worker process so the compiled template isn't pickled with every task
+worker_template = None
+worker_block_cache = None
+worker_body_cache = None
+worker_minify = False
+
+def init_render_worker(template, trace_memory=False, block_cache=None, body_cache=None, minify=False):
+    global worker_template, worker_block_cache, worker_body_cache, worker_minify
+    worker_template = template
+    worker_block_cache = block_cache
+    worker_body_cache = body_cache
+    worker_minify = minify
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def render_page_task(task):
+    # Runs in a worker process, so failures and timings are returned rather than raised
+    from_path, dest_path = task
+    error = None
+    peak = None
+    saved = 0
+
+    # Only set up when profiling; the peak covers the whole process while the page renders
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        reset_traced_peak()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    try:
+        saved = render_page(from_path, worker_template, dest_path, worker_block_cache, worker_body_cache, worker_minify)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    cache_updates = worker_block_cache.take_updates() if worker_block_cache is not None else None
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    if tracing:
+        peak = tracemalloc.get_traced_memory()[1]
+    return error, wall, cpu, peak, cache_updates, saved
+
+def render_pages(pages, template, jobs=1, profiler=NULL_PROFILER, block_cache=None, body_cache=None, minify=False):
+    if jobs > 1 and len(pages) > 1:
+        initargs = (template, profiler.enabled and profiler.trace_memory, block_cache, body_cache, minify)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_render_worker, initargs=initargs) as executor:
+            chunksize = max(1, len(pages) // (jobs * 4))
+            # map() yields in submission order, so reporting stays deterministic
+            results = list(executor.map(render_page_task, pages, chunksize=chunksize))
+    else:
+        # The profiler has already started tracing this process if it wants memory numbers
+        init_render_worker(template, block_cache=block_cache, body_cache=body_cache, minify=minify)
+        results = [render_page_task(page) for page in pages]
+
+    failures = []
+    total_saved = 0
+    for (item_path, html_path), (error, wall, cpu, peak, cache_updates, saved) in zip(pages, results):
+        profiler.record_page(item_path, wall, cpu, peak)
+        if cache_updates is not None:
+            block_cache.merge(cache_updates)
+        if error is not None:
+            failures.append((item_path, error))
+        elif minify:
+            total_saved += saved
+            print(f"Generating: {item_path} -> {html_path} (minified, {saved} bytes saved)")
+        else:
+            print(f"Generating: {item_path} -> {html_path}")
+    return failures, total_saved
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest_path=None, jobs=1,
+                             profiler=NULL_PROFILER, block_cache=None, body_cache=None, minify=False,
+                             stylesheets=None, assets=None, shard=None, templates=None, file_index=None):
     print(f"Processing directory: {dir_path_content}")
-    
+
     # Ensure the destination directory exists
     os.makedirs(dest_dir_path, exist_ok=True)
-    
-    # Get all items in the current directory
-    try:
-        items = os.listdir(dir_path_content)
-    except Exception as e:
-        print(f"Error listing directory {dir_path_content}: {e}")
+
+    # Discover everything up front so the work can be split across processes
+    with profiler.stage("discovery"):
+        all_entries = discover_pages(dir_path_content, dest_dir_path, file_index)
+        entries = all_entries
+        if shard is not None:
+            entries = [(entry, html_path) for entry, html_path in all_entries if in_shard(shard_key(entry), shard)]
+            print(f"Shard {shard[0]}/{shard[1]}: {len(entries)} of {len(all_entries)} pages")
+        pages = [(entry.path, html_path) for entry, html_path in entries]
+
+    # Compiled once and shared by every page and worker; a TemplateCache carries it across builds
+    with profiler.stage("template compile"):
+        if templates is not None:
+            template = templates.load(template_path, basepath, stylesheets, assets)
+        else:
+            template = load_template(template_path, basepath, stylesheets, assets)
+
+    # Without a manifest every page is rebuilt
+    if manifest_path is None:
+        with profiler.stage("render"):
+            failures, minify_saved = render_pages(pages, template, jobs, profiler, block_cache, body_cache, minify)
+        if minify:
+            print(f"Minify: {minify_saved} bytes saved across {len(pages) - len(failures)} pages")
+        record_shard(dest_dir_path, shard, all_entries, entries, failures)
+        if failures:
+            raise PageBuildError(failures)
         return
-    
-    for item in items:
-        # Skip hidden files and directories
-        if item.startswith('.'):
-            continue
-        
-        item_path = os.path.join(dir_path_content, item)
-        
-        if os.path.isfile(item_path):
-            # Only process markdown files
-            if item.endswith('.md'):
-                # Convert filename.md to filename.html
-                html_filename = os.path.splitext(item)[0] + '.html'
-                html_path = os.path.join(dest_dir_path, html_filename)
-                
-                print(f"Generating: {item_path} -> {html_path}")
-                generate_page(item_path, template_path, html_path, basepath)
-        
-        elif os.path.isdir(item_path):
-            # Create equivalent directory in destination
-            new_dest_dir = os.path.join(dest_dir_path, item)
-            
-            # Recursively process the subdirectory
-            generate_pages_recursive(item_path, template_path, new_dest_dir, basepath) 
+
+    with profiler.stage("change detection"):
+        old_pages = load_manifest(manifest_path)["pages"]
+        new_manifest = empty_manifest()
+
+        template_hash = template.source_hash
+        stale_pages = []
+        refill_pages = []
+
+        for entry, html_path in entries:
+            item_path = entry.path
+            source_key = entry.relative_path
+            old_entry = old_pages.get(source_key)
+            source_hash = page_source_hash(entry, old_entry)
+
+            if page_is_current(old_entry, source_hash, template_hash, basepath, html_path, minify):
+                pass
+            elif (body_cache is not None and old_entry is not None
+                    and old_entry.get("source_hash") == source_hash and body_cache.has(source_hash)):
+                # Only the template, basepath or output path changed: reuse the rendered body
+                refill_pages.append((item_path, html_path, source_hash))
+            else:
+                stale_pages.append((item_path, html_path))
+
+            new_manifest["pages"][source_key] = {
+                "source_hash": source_hash,
+                "template_hash": template_hash,
+                "basepath": basepath,
+                "output": html_path,
+                "minify": minify,
+                "renderer": RENDERER_VERSION,
+                "size": entry.stat.st_size,
+                "mtime_ns": entry.stat.st_mtime_ns,
+            }
+
+    refilled = 0
+    refill_saved = 0
+    with profiler.stage("refill"):
+        for item_path, html_path, source_hash in refill_pages:
+            saved = refill_page(source_hash, template, html_path, body_cache, minify)
+            if saved is None:
+                stale_pages.append((item_path, html_path))
+                continue
+            refilled += 1
+            refill_saved += saved
+            if minify:
+                print(f"Refilling: {item_path} -> {html_path} (minified, {saved} bytes saved)")
+
+    with profiler.stage("render"):
+        failures, render_saved = render_pages(stale_pages, template, jobs, profiler, block_cache, body_cache, minify)
+
+    # Failed pages stay out of the manifest so the next build retries them
+    for item_path, _ in failures:
+        del new_manifest["pages"][os.path.relpath(item_path, dir_path_content)]
+
+    # Outputs whose source no longer exists (or moved to a new output path)
+    live_outputs = {entry["output"] for entry in new_manifest["pages"].values()}
+    # A shard keeps the outputs of pages other shards own
+    live_outputs.update(html_path for _, html_path in all_entries)
+    stale_entries = [
+        entry for entry in old_pages.values()
+        if entry.get("output") not in live_outputs
+    ]
+    with profiler.stage("prune"):
+        prune_outputs(stale_entries, dest_dir_path)
+        if body_cache is not None:
+            body_cache.prune({entry["source_hash"] for entry in new_manifest["pages"].values()})
+
+    save_manifest(manifest_path, new_manifest)
+    skipped = len(pages) - len(stale_pages) - refilled
+    print(f"Pages: {len(stale_pages) - len(failures)} generated, {refilled} refilled from cache, "
+          f"{skipped} unchanged, {len(failures)} failed, {len(stale_entries)} pruned")
+    if minify:
+        print(f"Minify: {render_saved + refill_saved} bytes saved across {len(stale_pages) - len(failures) + refilled} pages")
+    record_shard(dest_dir_path, shard, all_entries, entries, failures)
+
+    if failures:
+        raise PageBuildError(failures)
 
 if __name__ == "__main__":
     #generate_page('content/index.md', 'template.html', 'public/index.html')
@@ -0,0 +1,125 @@
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+from copystatic import remove_empty_parents
+from manifest import load_manifest, save_manifest, empty_manifest, hash_bytes
+
+# Text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg", ".txt", ".xml")
+
+class PrecompressReport:
+    def __init__(self):
+        self.compressed = 0
+        self.unchanged = 0
+        self.not_worth_it = 0
+        self.removed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __repr__(self):
+        return (
+            f"PrecompressReport(compressed={self.compressed}, unchanged={self.unchanged}, "
+            f"not_worth_it={self.not_worth_it}, removed={self.removed}, "
+            f"bytes_in={self.bytes_in}, bytes_out={self.bytes_out})"
+        )
+
+def find_compressible_files(root, min_size):
+    files = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for name in sorted(file_names):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(dir_path, name)
+            # Below the threshold the gzip header and the extra request logic cost more than they save
+            if os.path.getsize(path) >= min_size:
+                files.append(os.path.relpath(path, root))
+    return files
+
+def remove_file(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def compress_task(task):
+    root, relative_path, previous, level, max_ratio = task
+    path = os.path.join(root, relative_path)
+    gz_path = path + ".gz"
+
+    with open(path, 'rb') as source_file:
+        stat = os.fstat(source_file.fileno())
+        data = source_file.read()
+    source_hash = hash_bytes(data)
+    # Size and mtime let readers such as the preview server trust the hash without rehashing
+    identity = {"source_hash": source_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if previous is not None and previous.get("source_hash") == source_hash:
+        if not previous.get("compressed") or os.path.isfile(gz_path):
+            return "unchanged", dict(previous, **identity), len(data), 0
+
+    # mtime=0 keeps the output byte-identical between builds
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if len(compressed) > len(data) * max_ratio:
+        remove_file(gz_path)
+        return "not_worth_it", dict(identity, compressed=False), len(data), 0
+
+    tmp_path = f"{gz_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as gz_file:
+        gz_file.write(compressed)
+    os.replace(tmp_path, gz_path)
+    return "compressed", dict(identity, compressed=True), len(data), len(compressed)
+
+def precompress_tree(root, manifest_path, jobs=1, min_size=1024, level=9, max_ratio=0.9):
+    report = PrecompressReport()
+    previous = load_manifest(manifest_path, "gzip")["gzip"]
+    manifest = empty_manifest("gzip")
+
+    files = find_compressible_files(root, min_size)
+    tasks = [(root, relative_path, previous.get(relative_path), level, max_ratio) for relative_path in files]
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(compress_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    else:
+        results = [compress_task(task) for task in tasks]
+
+    for relative_path, (status, entry, bytes_in, bytes_out) in zip(files, results):
+        manifest["gzip"][relative_path] = entry
+        if status == "compressed":
+            report.compressed += 1
+            report.bytes_in += bytes_in
+            report.bytes_out += bytes_out
+        elif status == "unchanged":
+            report.unchanged += 1
+        else:
+            report.not_worth_it += 1
+
+    # Siblings of files that were deleted or fell under the size threshold
+    for relative_path, entry in previous.items():
+        if relative_path not in manifest["gzip"] and entry.get("compressed"):
+            if remove_sibling(root, relative_path):
+                report.removed += 1
+
+    save_manifest(manifest_path, manifest)
+    return report
+
+def remove_sibling(root, relative_path):
+    gz_path = os.path.join(root, relative_path + ".gz")
+    if not remove_file(gz_path):
+        return False
+    # A deleted page's folder is only emptied once its .gz is gone too
+    remove_empty_parents(gz_path, root)
+    return True
+
+def remove_precompressed(root, manifest_path):
+    # A build without precompression must not leave earlier .gz files to be served for newer outputs
+    report = PrecompressReport()
+    if not os.path.isfile(manifest_path):
+        return report
+    for relative_path, entry in load_manifest(manifest_path, "gzip")["gzip"].items():
+        if entry.get("compressed") and remove_sibling(root, relative_path):
+            report.removed += 1
+    os.remove(manifest_path)
+    return report
@@ -0,0 +1,112 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+# tracemalloc keeps one peak per process. Resetting it to measure a single page would
+# lose whatever earlier stages reached, so the largest peak reset away is kept here
+peak_before_reset = 0
+
+def reset_traced_peak():
+    global peak_before_reset
+    peak_before_reset = max(peak_before_reset, tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+
+def traced_peak():
+    return max(peak_before_reset, tracemalloc.get_traced_memory()[1])
+
+class NullProfiler:
+    enabled = False
+    trace_memory = False
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def record_page(self, path, wall, cpu, peak=None):
+        pass
+
+class BuildProfiler:
+    enabled = True
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.pages = []
+        self.peak_memory = None
+        self.started_tracing = False
+
+    def start(self):
+        global peak_before_reset
+        peak_before_reset = 0
+        if not self.trace_memory:
+            return
+        if tracemalloc.is_tracing():
+            # Peaks from before this build aren't its own
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        peaks = [entry["peak_memory"] for entry in self.pages if entry["peak_memory"] is not None]
+        if tracemalloc.is_tracing():
+            peaks.append(traced_peak())
+            if self.started_tracing:
+                tracemalloc.stop()
+                self.started_tracing = False
+
+        # Page renders reset the peak, so the build's peak is the largest one seen
+        # by any process, main or worker
+        self.peak_memory = max(peaks) if peaks else None
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                "stage": name,
+                "wall": time.perf_counter() - wall_start,
+                "cpu": time.process_time() - cpu_start,
+            })
+
+    def record_page(self, path, wall, cpu, peak=None):
+        self.pages.append({"page": path, "wall": wall, "cpu": cpu, "peak_memory": peak})
+
+    def to_dict(self):
+        return {
+            "stages": self.stages,
+            "pages": self.pages,
+            "peak_memory": self.peak_memory,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as profile_file:
+            json.dump(self.to_dict(), profile_file, indent=2)
+
+    def report(self, top=10):
+        lines = ["Build profile", "  Slowest stages:"]
+        for entry in sorted(self.stages, key=lambda e: e["wall"], reverse=True)[:top]:
+            lines.append(f"    {entry['wall']:8.3f}s wall {entry['cpu']:8.3f}s cpu  {entry['stage']}")
+
+        if self.pages:
+            lines.append("  Slowest pages:")
+            for entry in sorted(self.pages, key=lambda e: e["wall"], reverse=True)[:top]:
+                peak = f"  {format_bytes(entry['peak_memory'])} peak" if entry["peak_memory"] is not None else ""
+                lines.append(f"    {entry['wall']:8.3f}s wall {entry['cpu']:8.3f}s cpu{peak}  {entry['page']}")
+
+        if self.peak_memory is not None:
+            lines.append(f"  Peak traced memory: {format_bytes(self.peak_memory)}")
+        return "\n".join(lines)
+
+NULL_PROFILER = NullProfiler()
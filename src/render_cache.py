@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from block_markdown import iter_blocks, block_to_html_nodes
+from htmlnode import write_html, rewrite_url
+
+CACHE_VERSION = 1
+# Bump whenever the same markdown renders to different HTML (block_markdown,
+# inline_markdown, htmlnode). Cached fragments and bodies and the pages recorded
+# in pages.json from another renderer are all rebuilt.
+RENDERER_VERSION = 1
+
+# Fragments are cached before the basepath is known: site-relative URLs are
+# serialized with this marker in place of the leading "/", and the basepath is
+# put back in when the page is assembled. NUL never appears in real markdown.
+URL_PREFIX_MARKER = "\x00"
+# The marker only ever starts an attribute value, so the URL runs to the closing quote
+MARKED_URL_PATTERN = re.compile(URL_PREFIX_MARKER + '[^"]*')
+
+def block_key(block):
+    digest = hashlib.sha256()
+    digest.update(block.block_type.value.encode('utf-8'))
+    digest.update(b"\x00")
+    digest.update("\n".join(block.lines).encode('utf-8'))
+    return digest.hexdigest()
+
+class BlockCache:
+    def __init__(self, path=None, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.new_entries = {}
+        self.hits = 0
+        self.misses = 0
+        # Set by anything the saved file doesn't reflect yet: a new entry or a change in LRU order
+        self.dirty = False
+
+    def load(self):
+        if self.path is None:
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable block cache {self.path}: {e}")
+            return self
+
+        if (isinstance(data, dict) and data.get("version") == CACHE_VERSION
+                and data.get("renderer") == RENDERER_VERSION):
+            # Stored least recently used first, so re-inserting keeps the LRU order
+            for key, fragment in data.get("entries", []):
+                self.put(key, fragment, record=False)
+        return self
+
+    def save(self):
+        # A build that rendered nothing leaves the file as it was
+        if self.path is None or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump({"version": CACHE_VERSION, "renderer": RENDERER_VERSION,
+                       "entries": list(self.entries.items())}, cache_file)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def get(self, key):
+        fragment = self.entries.get(key)
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        self.dirty = True
+        return fragment
+
+    def put(self, key, fragment, record=True):
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = fragment
+        self.size += len(fragment)
+        if record:
+            self.new_entries[key] = fragment
+            self.dirty = True
+
+        # Evict least recently used fragments until we're back under the cap
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def take_updates(self):
+        # Worker processes hand back what they rendered (and their hit counts)
+        # so the parent can persist and report it
+        updates = (self.new_entries, self.hits, self.misses)
+        self.new_entries = {}
+        self.hits = 0
+        self.misses = 0
+        return updates
+
+    def merge(self, updates):
+        entries, hits, misses = updates
+        for key, fragment in entries.items():
+            self.put(key, fragment, record=False)
+        if entries:
+            self.dirty = True
+        self.hits += hits
+        self.misses += misses
+
+def render_block(block):
+    parts = []
+    for node in block_to_html_nodes(block):
+        write_html(node, parts.append, URL_PREFIX_MARKER)
+    return "".join(parts)
+
+def markdown_to_cached_html(markdown, cache, basepath="/", assets=None):
+    # Same output as markdown_to_html_node(markdown).to_html(basepath), but only
+    # blocks that aren't in the cache are parsed into nodes and rendered.
+    # With basepath=None the URL marker is left in for the caller to fill.
+    fragments = ["<div>"]
+    for block in iter_blocks(markdown.splitlines()):
+        key = block_key(block)
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = render_block(block)
+            cache.put(key, fragment)
+        fragments.append(fragment)
+
+    if not any(fragments[1:]):
+        raise ValueError("ParentNode must have children")
+    fragments.append("</div>")
+    html = "".join(fragments)
+    return html if basepath is None else fill_url_prefix(html, basepath, assets)
+
+def fill_url_prefix(html, basepath, assets=None):
+    # Fingerprinted names aren't baked into cached fragments either, so an asset
+    # change never invalidates the block or body caches
+    if assets:
+        return MARKED_URL_PATTERN.sub(lambda match: rewrite_url(match.group(0), basepath, assets), html)
+    return html.replace(URL_PREFIX_MARKER, basepath)
+
+class PageBodyCache:
+    # One small JSON file per page body, named by the source file's hash, so
+    # workers can write entries directly and identical sources share one entry
+    def __init__(self, directory):
+        self.directory = directory
+
+    def entry_path(self, source_hash):
+        return os.path.join(self.directory, source_hash + ".json")
+
+    def get(self, source_hash):
+        try:
+            with open(self.entry_path(source_hash), 'r', encoding='utf-8') as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != CACHE_VERSION or entry.get("renderer") != RENDERER_VERSION:
+            return None
+        return entry["title"], entry["body"]
+
+    def has(self, source_hash):
+        return os.path.isfile(self.entry_path(source_hash))
+
+    def put(self, source_hash, title, body):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.entry_path(source_hash)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as entry_file:
+            json.dump({"version": CACHE_VERSION, "renderer": RENDERER_VERSION, "title": title, "body": body},
+                      entry_file)
+        os.replace(tmp_path, path)
+
+    def prune(self, keep_hashes):
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and name[:-len(".json")] not in keep_hashes:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+        return removed
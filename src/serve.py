@@ -0,0 +1,272 @@
+import argparse
+import email.utils
+import mimetypes
+import os
+import posixpath
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from copystatic import ASSET_MANIFEST_NAME
+from manifest import load_manifest, hash_file
+
+# (manifest file, section, hash field) whose entries carry size and mtime_ns next to the hash
+MANIFEST_SOURCES = (("outputs.json", "outputs", "hash"), ("gzip.json", "gzip", "source_hash"))
+
+class ETagIndex:
+    def __init__(self, root, cache_dir=None):
+        self.root = root
+        self.lock = threading.Lock()
+        # Absolute path -> (size, mtime_ns, hash); a hash is only trusted while the stat still matches
+        self.entries = {}
+        self.hashed = 0
+        if cache_dir is not None:
+            for file_name, section, hash_field in MANIFEST_SOURCES:
+                self.seed(os.path.join(cache_dir, file_name), section, hash_field)
+
+    def seed(self, manifest_path, section, hash_field):
+        for relative_path, entry in load_manifest(manifest_path, section)[section].items():
+            if hash_field in entry and "size" in entry and "mtime_ns" in entry:
+                path = os.path.join(self.root, relative_path)
+                self.entries[path] = (entry["size"], entry["mtime_ns"], entry[hash_field])
+
+    def get(self, path, stat):
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+
+        # Files changed since the last build (e.g. by --watch) are hashed once per change
+        digest = hash_file(path)
+        with self.lock:
+            self.entries[path] = (stat.st_size, stat.st_mtime_ns, digest)
+            self.hashed += 1
+        return digest
+
+def resolve_path(url_path, root, basepath="/"):
+    path = urllib.parse.unquote(url_path.split('?', 1)[0].split('#', 1)[0])
+    prefix = basepath if basepath.endswith("/") else basepath + "/"
+    if path == prefix.rstrip("/"):
+        path = prefix
+    if not path.startswith(prefix):
+        return None
+
+    parts = []
+    for part in posixpath.normpath(path[len(prefix):]).split("/"):
+        if part in ("", "."):
+            continue
+        # Never walk out of the output directory
+        if part == ".." or "\x00" in part:
+            return None
+        parts.append(part)
+    return os.path.join(root, *parts)
+
+def parse_range(header, size):
+    # Returns (start, end) inclusive, "unsatisfiable", or None to serve the whole file
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                return "unsatisfiable"
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+def etag_matches(header, etag):
+    if header is None:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # If-None-Match uses the weak comparison
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def accepts_gzip(header):
+    for coding in (header or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+class PreviewServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root, basepath="/", etags=None, quiet=False):
+        self.root = os.path.abspath(root)
+        self.basepath = basepath
+        self.etags = etags if etags is not None else ETagIndex(self.root)
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        self.assets_mtime = None
+        self.fingerprinted = frozenset()
+        super().__init__(address, PreviewHandler)
+
+    def fingerprinted_paths(self):
+        # Reread whenever a build rewrites the asset manifest
+        manifest_path = os.path.join(self.root, ASSET_MANIFEST_NAME)
+        try:
+            mtime = os.stat(manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return frozenset()
+        with self.lock:
+            if mtime != self.assets_mtime:
+                assets = load_manifest(manifest_path, "assets")["assets"]
+                self.fingerprinted = frozenset(os.path.join(self.root, *name.split("/")) for name in assets.values())
+                self.assets_mtime = mtime
+            return self.fingerprinted
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    server_version = "SitePreview/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def serve(self, send_body):
+        path = resolve_path(self.path, self.server.root, self.server.basepath)
+        if path is None:
+            self.send_error(404)
+            return
+
+        if os.path.isdir(path):
+            url_path = self.path.split('?', 1)[0]
+            if not url_path.endswith("/"):
+                self.send_response(301)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = os.path.join(path, "index.html")
+
+        try:
+            source = open(path, 'rb')
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            self.send_error(404)
+            return
+
+        with source:
+            stat = os.fstat(source.fileno())
+            etag = '"' + self.server.etags.get(path, stat) + '"'
+            body, body_stat, encoding = source, stat, None
+
+            range_header = self.headers.get("Range")
+            if range_header is None and accepts_gzip(self.headers.get("Accept-Encoding")):
+                gz_file = self.open_fresh_gzip(path, stat)
+                if gz_file is not None:
+                    # The .gz is deterministic for a given source, so its tag derives from the source hash
+                    body, body_stat, encoding = gz_file, os.fstat(gz_file.fileno()), "gzip"
+                    etag = etag[:-1] + '-gzip"'
+
+            try:
+                self.send_representation(path, stat, body, body_stat, etag, encoding, range_header, send_body)
+            finally:
+                if body is not source:
+                    body.close()
+
+    def open_fresh_gzip(self, path, stat):
+        try:
+            gz_file = open(path + ".gz", 'rb')
+        except OSError:
+            return None
+        # A sibling older than its source was left behind by a rebuild without --precompress
+        if os.fstat(gz_file.fileno()).st_mtime_ns < stat.st_mtime_ns:
+            gz_file.close()
+            return None
+        return gz_file
+
+    def send_representation(self, path, stat, body, body_stat, etag, encoding, range_header, send_body):
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_common_headers(path, stat, etag)
+            self.end_headers()
+            return
+
+        size = body_stat.st_size
+        byte_range = None
+        if_range = self.headers.get("If-Range")
+        if range_header is not None and (if_range is None or if_range.strip() == etag):
+            byte_range = parse_range(range_header, size)
+
+        if byte_range == "unsatisfiable":
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if byte_range is None:
+            offset, count = 0, size
+            self.send_response(200)
+        else:
+            offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {byte_range[0]}-{byte_range[1]}/{size}")
+
+        self.send_common_headers(path, stat, etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(count))
+        self.end_headers()
+
+        if send_body and count:
+            # socket.sendfile() goes through os.sendfile, so the bytes never pass through Python
+            self.connection.sendfile(body, offset, count)
+
+    def send_common_headers(self, path, stat, etag):
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        if path in self.server.fingerprinted_paths():
+            # A fingerprinted name always refers to the same bytes
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            # Always revalidate; an unchanged file costs a 304 and no body
+            self.send_header("Cache-Control", "no-cache")
+
+def make_server(root, basepath="/", host="127.0.0.1", port=8888, cache_dir=None, quiet=False):
+    root = os.path.abspath(root)
+    return PreviewServer((host, port), root, basepath, ETagIndex(root, cache_dir), quiet)
+
+def parse_args(argv):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Serve the built site for local preview")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site was built with")
+    parser.add_argument("--port", "-p", type=int, default=8888)
+    parser.add_argument("--bind", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--dir", default=os.path.join(script_dir, '..', 'docs'), help="directory to serve")
+    parser.add_argument("--cache-dir", default=os.path.join(script_dir, '..', '.build-cache'),
+                        help="where the build manifests live")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    server = make_server(args.dir, args.basepath, args.bind, args.port, args.cache_dir)
+    print(f"Serving {server.root} at http://{args.bind}:{server.server_address[1]}{args.basepath}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import shutil
+from copystatic import files_equal, replace_if_changed, remove_empty_parents
+from discovery import scan_tree
+from manifest import load_manifest, save_manifest, MANIFEST_VERSION
+
+# Written into the root of each shard's output; the merge reads it and leaves it out
+SHARD_MANIFEST_NAME = "shard.json"
+
+def parse_shard(value):
+    # "2/4" -> (2, 4); shards are numbered from 1 like most CI matrices
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"expected a shard like 2/4, got {value!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"shard {index} is outside 1..{count}")
+    return index, count
+
+def shard_for(source_key, count):
+    # Hashes the "/"-separated source path, so every machine assigns a page to the same shard
+    digest = hashlib.sha256(source_key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+def in_shard(source_key, shard):
+    index, count = shard
+    return shard_for(source_key, count) == index
+
+def write_shard_manifest(destination_folder, shard, pages, built):
+    # pages maps every discovered source to its output, so the merge can tell which are missing
+    manifest_path = os.path.join(destination_folder, SHARD_MANIFEST_NAME)
+    if shard is None:
+        if os.path.isfile(manifest_path):
+            os.remove(manifest_path)
+        return
+    save_manifest(manifest_path, {
+        "version": MANIFEST_VERSION,
+        "shard": list(shard),
+        "pages": pages,
+        "built": sorted(built),
+    })
+
+class ShardMergeError(Exception):
+    def __init__(self, conflicts, missing):
+        self.conflicts = conflicts
+        self.missing = missing
+        lines = [f"Shard merge failed: {len(conflicts)} conflict(s), {len(missing)} missing page(s)"]
+        lines.extend(f"  conflict: {conflict}" for conflict in conflicts)
+        lines.extend(f"  missing: {source_key}" for source_key in missing)
+        super().__init__("\n".join(lines))
+
+class MergeReport:
+    def __init__(self):
+        self.pages = 0
+        self.copied = 0
+        self.unchanged = 0
+        self.deleted = 0
+
+    def __repr__(self):
+        return (
+            f"MergeReport(pages={self.pages}, copied={self.copied}, "
+            f"unchanged={self.unchanged}, deleted={self.deleted})"
+        )
+
+def load_shard(shard_folder):
+    manifest = load_manifest(os.path.join(shard_folder, SHARD_MANIFEST_NAME), "pages")
+    if "shard" not in manifest:
+        raise ShardMergeError([f"{shard_folder} has no readable {SHARD_MANIFEST_NAME}"], [])
+    return manifest
+
+def plan_merge(shard_folders):
+    # Works out where every merged file comes from without writing anything
+    conflicts = []
+    missing = []
+    shards = {}
+    count = None
+    pages = None
+
+    for shard_folder in shard_folders:
+        manifest = load_shard(shard_folder)
+        index, shard_count = manifest["shard"]
+        if count is None:
+            count, pages = shard_count, manifest["pages"]
+        elif shard_count != count:
+            conflicts.append(f"{shard_folder} is shard {index}/{shard_count}, expected one of {count}")
+            continue
+        elif manifest["pages"] != pages:
+            # The shards were built from different content
+            changed = set(pages.items()) ^ set(manifest["pages"].items())
+            conflicts.extend(f"{source_key} differs in {shard_folder}" for source_key in sorted({key for key, _ in changed}))
+            continue
+        if index in shards:
+            conflicts.append(f"shard {index}/{count} given twice: {shards[index][0]} and {shard_folder}")
+            continue
+        shards[index] = (shard_folder, set(manifest["built"]))
+
+    if conflicts:
+        return None, conflicts, missing
+
+    # Each page output (and its .gz) comes from the shard that owns it; other shards
+    # may hold stale copies from earlier builds
+    owners = {}
+    for source_key, output in sorted(pages.items()):
+        index = shard_for(source_key, count)
+        shard = shards.get(index)
+        if shard is None or source_key not in shard[1]:
+            missing.append(source_key)
+            continue
+        for claimed_index, (shard_folder, built) in shards.items():
+            if claimed_index != index and source_key in built:
+                conflicts.append(f"{source_key} built by shard {claimed_index}, but it belongs to shard {index}")
+        owners[output] = shard[0]
+        owners[output + ".gz"] = shard[0]
+
+    sources = {}
+    for index in sorted(shards):
+        shard_folder = shards[index][0]
+        for entry in scan_tree(shard_folder):
+            relative_path = entry.relative_path.replace(os.sep, "/")
+            if relative_path in (SHARD_MANIFEST_NAME, SHARD_MANIFEST_NAME + ".gz"):
+                continue
+            owner = owners.get(relative_path)
+            if owner is not None:
+                if owner == shard_folder:
+                    sources[relative_path] = entry.path
+                continue
+
+            # Everything else (static files, CSS, asset manifests) is built by every shard and must agree
+            existing = sources.get(relative_path)
+            if existing is None:
+                sources[relative_path] = entry.path
+            elif not files_equal(existing, entry.path):
+                conflicts.append(f"{relative_path} differs between {existing} and {entry.path}")
+
+    # An owned page whose output was never written
+    for output, owner in owners.items():
+        if not output.endswith(".gz") and output not in sources:
+            conflicts.append(f"{output} is listed by {owner} but missing from its output")
+
+    return sources, conflicts, missing
+
+def merge_shards(shard_folders, destination_folder):
+    sources, conflicts, missing = plan_merge(shard_folders)
+    if conflicts or missing:
+        raise ShardMergeError(conflicts, missing)
+
+    report = MergeReport()
+    report.pages = len(load_shard(shard_folders[0])["pages"])
+    os.makedirs(destination_folder, exist_ok=True)
+
+    for relative_path, source_path in sorted(sources.items()):
+        destination_path = os.path.join(destination_folder, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        tmp_path = f"{destination_path}.{os.getpid()}.tmp"
+        shutil.copy2(source_path, tmp_path)
+        if replace_if_changed(tmp_path, destination_path):
+            report.copied += 1
+        else:
+            report.unchanged += 1
+
+    # The merged tree is exactly the union of the shards
+    for entry in scan_tree(destination_folder):
+        if entry.relative_path.replace(os.sep, "/") not in sources:
+            os.remove(entry.path)
+            remove_empty_parents(entry.path, destination_folder)
+            report.deleted += 1
+
+    return report
@@ -0,0 +1,82 @@
+import ctypes
+import os
+import shutil
+
+# renameat2(2) flag that swaps two paths in one step; Linux 3.15+
+RENAME_EXCHANGE = 2
+AT_FDCWD = -100
+
+def exchange_paths(path_a, path_b):
+    libc = ctypes.CDLL(None, use_errno=True)
+    renameat2 = getattr(libc, "renameat2", None)
+    if renameat2 is None:
+        raise OSError(38, "renameat2 is not available")  # ENOSYS
+    if renameat2(AT_FDCWD, os.fsencode(path_a), AT_FDCWD, os.fsencode(path_b), RENAME_EXCHANGE) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno), path_a)
+
+def link_tree(source_folder, destination_folder):
+    # Mirrors the tree with hardlinks; every build stage replaces files rather than
+    # writing into them, so the previous output is never modified through a link
+    linked = copied = 0
+    for dir_path, dir_names, file_names in os.walk(source_folder):
+        target_dir = os.path.join(destination_folder, os.path.relpath(dir_path, source_folder))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in file_names:
+            source_path = os.path.join(dir_path, name)
+            target_path = os.path.join(target_dir, name)
+            try:
+                os.link(source_path, target_path)
+                linked += 1
+            except OSError:
+                # Filesystems without hardlinks still work, just not for free
+                shutil.copy2(source_path, target_path)
+                copied += 1
+    return linked, copied
+
+class StagedOutput:
+    def __init__(self, output_dir, stale_manifests=()):
+        self.output_dir = os.path.abspath(output_dir)
+        parent, name = os.path.split(self.output_dir)
+        # Siblings of the output so renames stay on one filesystem; the staging path is
+        # the same every build, so manifests recording output paths stay valid
+        self.path = os.path.join(parent, f".{name}.staging")
+        self.old_path = os.path.join(parent, f".{name}.old")
+        # Manifests describing the staged tree; forgotten if it is thrown away
+        self.stale_manifests = stale_manifests
+
+    def prepare(self):
+        # Leftovers of an interrupted build
+        for path in (self.path, self.old_path):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+
+        if os.path.isdir(self.output_dir):
+            return link_tree(self.output_dir, self.path)
+        os.makedirs(self.path)
+        return 0, 0
+
+    def commit(self):
+        if not os.path.isdir(self.output_dir):
+            os.rename(self.path, self.output_dir)
+            return "rename"
+
+        try:
+            exchange_paths(self.path, self.output_dir)
+            swap = "exchange"
+        except OSError:
+            # Two renames leave a moment without an output directory, but never a partial one
+            os.rename(self.output_dir, self.old_path)
+            os.rename(self.path, self.output_dir)
+            swap = "rename"
+
+        shutil.rmtree(self.path if swap == "exchange" else self.old_path)
+        return swap
+
+    def abandon(self):
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        # The caches described a tree that no longer exists; the next build starts from the real output
+        for manifest_path in self.stale_manifests:
+            if os.path.isfile(manifest_path):
+                os.remove(manifest_path)
@@ -0,0 +1,107 @@
+import json
+import re
+from css import defer_stylesheets
+from htmlnode import URL_ATTRIBUTES, rewrite_url
+from manifest import hash_bytes
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(' + "|".join(URL_ATTRIBUTES) + r')="(/[^"]*)"')
+
+class CompiledTemplate:
+    def __init__(self, template_content, basepath="/", source_hash=None, assets=None):
+        self.basepath = basepath
+        # Logical asset path -> fingerprinted name, applied wherever the basepath is
+        self.assets = assets
+        self.source_hash = source_hash
+        # Set when stylesheets are inlined; fills the CriticalCSS slot per page
+        self.critical_styles = None
+
+        # Rewrite site-relative URLs once, in the template only; the page body is
+        # rewritten on its nodes, so the finished document is never rescanned
+        template_content = URL_ATTRIBUTE_PATTERN.sub(
+            lambda match: f'{match.group(1)}="{rewrite_url(match.group(2), basepath, assets)}"', template_content
+        )
+
+        # Even positions hold literal text, odd positions hold slot names
+        self.parts = SLOT_PATTERN.split(template_content)
+        self.slots = [(i, self.parts[i]) for i in range(1, len(self.parts), 2)]
+
+    def render(self, **values):
+        parts = self.parts.copy()
+        for i, name in self.slots:
+            if name not in values:
+                raise ValueError(f"No value given for template slot '{name}'")
+            parts[i] = values[name]
+        return "".join(parts)
+
+    def render_to(self, writer, **values):
+        # Streams the page; a callable slot value is handed the write function
+        # so large content can be written without building it as a string
+        write = writer.write if hasattr(writer, "write") else writer
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                write(part)
+                continue
+
+            if part not in values:
+                raise ValueError(f"No value given for template slot '{part}'")
+            value = values[part]
+            if callable(value):
+                value(write)
+            else:
+                write(value)
+
+    def __repr__(self):
+        return f"CompiledTemplate({[name for _, name in self.slots]}, {self.basepath})"
+
+def asset_map_digest(assets):
+    return hash_bytes(json.dumps(assets, sort_keys=True).encode('utf-8'))
+
+def load_template(template_path, basepath="/", stylesheets=None, assets=None):
+    with open(template_path, 'rb') as template_file:
+        template_bytes = template_file.read()
+    return compile_template(template_bytes, basepath, stylesheets, assets)
+
+def compile_template(template_bytes, basepath="/", stylesheets=None, assets=None):
+    template_content = template_bytes.decode('utf-8')
+    critical_styles = None
+    if stylesheets:
+        template_content, critical_styles = defer_stylesheets(template_content, stylesheets)
+
+    template = CompiledTemplate(template_content, basepath, hash_bytes(template_bytes), assets)
+    if assets:
+        # Every page links through the asset map, so a renamed asset must reach all of them
+        template.source_hash = hash_bytes((template.source_hash + asset_map_digest(assets)).encode('utf-8'))
+    if critical_styles is not None:
+        # The inlined rules are part of every page, so a stylesheet edit must rebuild them
+        template.source_hash = hash_bytes((template.source_hash + critical_styles.digest).encode('utf-8'))
+        template.critical_styles = critical_styles
+    return template
+
+class TemplateCache:
+    # Holds the compiled template between builds of a long-lived process. The file is
+    # still read every time, it's small; only unchanged inputs skip the compile
+    def __init__(self):
+        self.key = None
+        self.template = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, template_path, basepath="/", stylesheets=None, assets=None):
+        with open(template_path, 'rb') as template_file:
+            template_bytes = template_file.read()
+
+        key = (
+            hash_bytes(template_bytes),
+            basepath,
+            tuple(sorted((path, sheet.digest) for path, sheet in (stylesheets or {}).items())),
+            asset_map_digest(assets) if assets else None,
+        )
+        if key == self.key:
+            self.hits += 1
+            return self.template
+
+        self.misses += 1
+        self.template = compile_template(template_bytes, basepath, stylesheets, assets)
+        self.key = key
+        return self.template
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmark import generate_corpus, run_benchmark, STAGES
+from page_generator import find_markdown_files
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_corpus(self):
+        with tempfile.TemporaryDirectory() as root:
+            content_dir, static_dir, _ = generate_corpus(root, pages=20, depth=3, images=2, image_size=100)
+            pages = find_markdown_files(content_dir, os.path.join(root, "docs"))
+            self.assertEqual(len(pages), 20)
+            # three section levels plus the page's own directory
+            relative = os.path.relpath(pages[0][0], content_dir)
+            self.assertEqual(len(relative.split(os.sep)), 5)
+            self.assertEqual(os.path.getsize(os.path.join(static_dir, "images", "image-1.png")), 100)
+
+    def test_corpus_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            generate_corpus(first, pages=2, images=0, seed=7)
+            generate_corpus(second, pages=2, images=0, seed=7)
+            path = os.path.join("content", "section-1", "section-0", "page-1", "index.md")
+            with open(os.path.join(first, path)) as a, open(os.path.join(second, path)) as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_run_benchmark_reports_every_stage(self):
+        results = run_benchmark(pages=3, blocks=6, images=1, image_size=1024, repeat=2)
+        self.assertEqual(list(results["stages"]), STAGES)
+        self.assertEqual(len(results["stages"]["to_html"]["runs"]), 2)
+        # Must round-trip as JSON so runs from different commits can be compared
+        self.assertEqual(json.loads(json.dumps(results))["corpus"]["pages"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
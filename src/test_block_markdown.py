@@ -1,5 +1,5 @@
 import unittest
-from block_markdown import markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node
+from block_markdown import markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node, parse_blocks, Block
 
 
 class TestBlockMarkdown(unittest.TestCase):
@@ -46,6 +46,64 @@ class TestBlockMarkdown(unittest.TestCase):
                 ],
             )
 
+class TestParseBlocks(unittest.TestCase):
+    def test_typed_blocks_with_lines(self):
+        md = """
+# Title
+
+- one
+- two
+
+1. first
+2. second
+"""
+        self.assertEqual(
+            parse_blocks(md),
+            [
+                Block(BlockType.HEADING, ["# Title"]),
+                Block(BlockType.UNORDERED_LIST, ["- one", "- two"]),
+                Block(BlockType.ORDERED_LIST, ["1. first", "2. second"]),
+            ],
+        )
+
+    def test_whitespace_only_line_separates_blocks(self):
+        md = "first paragraph\n   \nsecond paragraph"
+        self.assertEqual(markdown_to_blocks(md), ["first paragraph", "second paragraph"])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "```\nline one\n\nline two\n```\n\nafter"
+        blocks = parse_blocks(md)
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(blocks[0].block_type, BlockType.CODE)
+        self.assertEqual(blocks[0].lines, ["```", "line one", "", "line two", "```"])
+        self.assertEqual(blocks[1], Block(BlockType.PARAGRAPH, ["after"]))
+
+    def test_unclosed_fence_falls_back_to_blank_line_splitting(self):
+        md = "# T\n\n```\ncode\n\n## Next section\n\n- a"
+        self.assertEqual(markdown_to_blocks(md), ["# T", "```\ncode", "## Next section", "- a"])
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><h1>T</h1><p><code></code>`\ncode</p><h2>Next section</h2><ul><li>a</li></ul></div>",
+        )
+
+    def test_fence_with_language_renders(self):
+        md = "```python\nx = 1\n\ny = 2\n```\n\nafter"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><pre><code>x = 1\n\ny = 2</code></pre><p>after</p></div>",
+        )
+
+    def test_only_a_bare_fence_closes(self):
+        md = "```\nsome code```\nmore\n```"
+        self.assertEqual(markdown_to_blocks(md), [md])
+        self.assertEqual(markdown_to_html_node(md).to_html(), "<div><pre><code>some code```\nmore</code></pre></div>")
+
+    def test_many_unclosed_fences(self):
+        md = "\n\n".join(f"```x{i}\nline" for i in range(5000))
+        blocks = markdown_to_blocks(md)
+        self.assertEqual(len(blocks), 5000)
+        self.assertEqual(blocks[-1], "```x4999\nline")
+
 class TestBlockTypeDetection(unittest.TestCase):
     def test_heading(self):
         self.assertEqual(block_to_block_type("# Heading 1"), BlockType.HEADING)
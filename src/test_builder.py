@@ -0,0 +1,117 @@
+import contextlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+import discovery
+from builder import BuildConfig, SiteBuilder, build_site
+from watcher import SiteWatcher
+
+class TestSiteBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("template.html", '<link href="/index.css" rel="stylesheet" /><title>{{ Title }}</title><body>{{ Content }}</body>')
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post\n\n[home](/)")
+        self.write("static/index.css", "body { margin: 0; }")
+        self.write("static/images/a.png", "png")
+        self.config = BuildConfig(self.root, "/site/", minify=True, critical_css=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(os.path.join(self.root, "docs", path), encoding="utf-8") as f:
+            return f.read()
+
+    def test_config_defaults_to_project_layout(self):
+        self.assertEqual(self.config.static_dir, os.path.join(self.root, "static"))
+        self.assertEqual(self.config.output_dir, os.path.join(self.root, "docs"))
+        self.assertEqual(self.config.cache_path("pages.json"), os.path.join(self.root, ".build-cache", "pages.json"))
+        elsewhere = BuildConfig(self.root, output_dir=os.path.join(self.root, "public"))
+        self.assertEqual(elsewhere.output_dir, os.path.join(self.root, "public"))
+
+    def test_build_site(self):
+        self.assertEqual(build_site(self.config), 0)
+        self.assertIn("<style>body{margin:0}</style>", self.read("index.html"))
+        self.assertIn('href="/site/"', self.read("blog/post.html"))
+        self.assertEqual(self.read("index.css"), "body{margin:0}")
+        self.assertEqual(self.read("images/a.png"), "png")
+        self.assertTrue(os.path.isfile(os.path.join(self.root, ".build-cache", "deploy.json")))
+
+    def test_rebuild_reuses_warm_state(self):
+        builder = SiteBuilder(self.config)
+        self.assertEqual(builder.build(), 0)
+        self.assertEqual(builder.templates.misses, 1)
+
+        self.assertEqual(builder.build(), 0)
+        self.assertEqual((builder.templates.hits, builder.templates.misses), (1, 1))
+
+        # An edit to the template is picked up by the same builder
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(builder.build(), 0)
+        self.assertEqual(builder.templates.misses, 2)
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_watch_after_staged_build_writes_live_output(self):
+        builder = SiteBuilder(self.config)
+        self.assertEqual(builder.build(), 0)
+        config = self.config
+        watcher = SiteWatcher(config.content_dir, config.static_dir, config.template_path, config.output_dir,
+                              config.basepath, minify=config.minify, css=builder.css,
+                              critical_css=config.critical_css, body_cache=builder.body_cache)
+        self.write("static/index.css", "body { margin: 1px; }")
+        stat = os.stat(os.path.join(self.root, "static", "index.css"))
+        os.utime(os.path.join(self.root, "static", "index.css"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertIn("rebuilt stylesheets", watcher.check())
+        self.assertEqual(self.read("index.css"), "body{margin:1px}")
+        self.assertIn("<style>body{margin:1px}</style>", self.read("index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, ".docs.staging")))
+
+    @contextlib.contextmanager
+    def unreadable(self, path):
+        os.chmod(path, 0)
+        try:
+            if not os.access(path, os.R_OK):
+                yield
+                return
+            # Permission bits don't stop root, so the listing is made to fail instead
+            listing = discovery.read_folder
+            def read_folder(folder):
+                if folder == path:
+                    raise PermissionError(13, "Permission denied", folder)
+                return listing(folder)
+            with mock.patch("discovery.read_folder", read_folder):
+                yield
+        finally:
+            os.chmod(path, 0o755)
+
+    def test_unlistable_content_prunes_nothing(self):
+        builder = SiteBuilder(self.config)
+        self.assertEqual(builder.build(), 0)
+        with open(os.path.join(self.root, ".build-cache", "deploy.json"), "rb") as f:
+            deploy_manifest = f.read()
+
+        with self.unreadable(os.path.join(self.root, "content", "blog")):
+            with self.assertRaises(PermissionError):
+                builder.build()
+        # The staged build is thrown away, so the live site and its deploy manifest are untouched
+        self.assertIn('href="/site/"', self.read("blog/post.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, ".docs.staging")))
+        with open(os.path.join(self.root, ".build-cache", "deploy.json"), "rb") as f:
+            self.assertEqual(f.read(), deploy_manifest)
+
+    def test_missing_content_fails(self):
+        config = BuildConfig(self.root, content_dir=os.path.join(self.root, "missing"), in_place=True)
+        self.assertEqual(build_site(config), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from copystatic import sync_folder, publish_file, write_asset_manifest, ASSET_MANIFEST_NAME, PUBLISH_STRATEGIES
+from manifest import hash_file, load_manifest
+
+class TestSyncFolder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, "cache", "static.json")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "tom.png"), "png bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def sync(self, compare_hash=False, strategy="copy", fingerprint=False):
+        return sync_folder(self.source, self.dest, self.manifest, compare_hash, strategy, fingerprint=fingerprint)
+
+    def test_fingerprinted_names(self):
+        digest = hash_file(os.path.join(self.source, "images", "tom.png"))
+        report = self.sync(fingerprint=True)
+        self.assertEqual(report.assets["images/tom.png"], f"images/tom.{digest[:10]}.png")
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "images", f"tom.{digest[:10]}.png")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "tom.png")))
+
+        # An edit publishes a new name and removes the old one
+        self.write(os.path.join(self.source, "images", "tom.png"), "new png bytes")
+        report = self.sync(fingerprint=True)
+        self.assertEqual((report.copied, report.deleted), (1, 1))
+        self.assertEqual(os.listdir(os.path.join(self.dest, "images")), [os.path.basename(report.assets["images/tom.png"])])
+
+        # Turning fingerprinting off goes back to plain names
+        report = self.sync()
+        self.assertEqual(report.deleted, 2)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dest, "images"))), ["tom.png"])
+
+    def test_asset_manifest(self):
+        write_asset_manifest(self.dest, {"index.css": "index.abc.css"})
+        path = os.path.join(self.dest, ASSET_MANIFEST_NAME)
+        self.assertEqual(load_manifest(path, "assets")["assets"], {"index.css": "index.abc.css"})
+        write_asset_manifest(self.dest, None)
+        self.assertFalse(os.path.exists(path))
+
+    def test_first_sync_copies_everything(self):
+        report = self.sync()
+        self.assertEqual(report.copied, 2)
+        self.assertEqual(report.bytes_copied, len("body {}") + len("png bytes"))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "images", "tom.png")))
+
+    def test_second_sync_skips_unchanged(self):
+        self.sync()
+        report = self.sync()
+        self.assertEqual(report.copied, 0)
+        self.assertEqual(report.skipped, 2)
+        self.assertEqual(report.bytes_skipped, len("body {}") + len("png bytes"))
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.source, "index.css"), "body { margin: 0 }")
+        report = self.sync()
+        self.assertEqual(report.copied, 1)
+        with open(os.path.join(self.dest, "index.css"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_orphans_deleted_but_other_outputs_kept(self):
+        self.sync()
+        self.write(os.path.join(self.dest, "index.html"), "<html></html>")
+        os.remove(os.path.join(self.source, "images", "tom.png"))
+        report = self.sync()
+        self.assertEqual(report.deleted, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "index.html")))
+
+    def test_hash_compare_skips_touched_identical_file(self):
+        self.sync()
+        source_mtime = os.stat(os.path.join(self.source, "index.css")).st_mtime_ns
+        os.utime(os.path.join(self.dest, "index.css"), ns=(0, 0))
+        self.assertEqual(self.sync(compare_hash=True).copied, 0)
+        # The match is kept in the manifest; neither file's mtime is rewritten
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns, 0)
+        self.assertEqual(os.stat(os.path.join(self.source, "index.css")).st_mtime_ns, source_mtime)
+        self.assertEqual(self.sync().copied, 0)
+
+        os.utime(os.path.join(self.dest, "index.css"), ns=(1, 1))
+        self.assertEqual(self.sync().copied, 1)
+
+    def test_every_strategy_publishes_identical_files(self):
+        source = os.path.join(self.source, "images", "tom.png")
+        for strategy in PUBLISH_STRATEGIES:
+            destination = os.path.join(self.tmp.name, f"{strategy}.png")
+            publish_file(source, destination, strategy)
+            with open(destination, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "png bytes")
+            self.assertEqual(os.stat(destination).st_mtime_ns, os.stat(source).st_mtime_ns)
+
+    def test_hardlink_shares_the_inode(self):
+        report = self.sync(strategy="hardlink")
+        self.assertEqual(report.strategies, {"hardlink": 2})
+        self.assertTrue(os.path.samefile(os.path.join(self.source, "index.css"), os.path.join(self.dest, "index.css")))
+        self.assertEqual(self.sync(strategy="hardlink").copied, 0)
+
+    def test_replacing_a_hardlink_never_writes_through(self):
+        self.sync(strategy="hardlink")
+        source = os.path.join(self.source, "index.css")
+        other = os.path.join(self.tmp.name, "other.css")
+        self.write(other, "p {}")
+        publish_file(other, os.path.join(self.dest, "index.css"), "copy")
+        with open(source, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_unsupported_strategy_falls_back(self):
+        with mock.patch("os.link", side_effect=OSError("cross-device link")):
+            used = publish_file(os.path.join(self.source, "index.css"), os.path.join(self.tmp.name, "x.css"), "hardlink")
+        self.assertNotEqual(used, "hardlink")
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "x.css")))
+        self.assertEqual([name for name in os.listdir(self.tmp.name) if name.endswith(".tmp")], [])
+
+if __name__ == "__main__":
+    unittest.main()
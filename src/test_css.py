@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+from block_markdown import markdown_to_html_node
+from copystatic import sync_folder
+from css import CssPipeline, Stylesheet, collect_tags, defer_stylesheets, minify_css, split_rules
+from template import load_template
+
+STYLESHEET = """
+/* site styles */
+body {
+    color: #fff;
+    font-family: "Courier  New", serif;
+}
+
+h1,
+h2 {
+    margin: 0 auto;
+}
+
+pre code {
+    padding: 0;
+}
+
+a:hover { color: red; }
+.note > p { width: calc(100% - 2px); }
+
+@media (max-width: 600px) {
+  body { padding: 0; }
+}
+"""
+
+class TestMinifyCss(unittest.TestCase):
+    def test_minify(self):
+        self.assertEqual(
+            minify_css(STYLESHEET),
+            'body{color:#fff;font-family:"Courier  New",serif}h1,h2{margin:0 auto}pre code{padding:0}'
+            'a:hover{color:red}.note>p{width:calc(100% - 2px)}@media (max-width:600px){body{padding:0}}',
+        )
+
+    def test_descendant_pseudo_class_keeps_its_space(self):
+        self.assertEqual(minify_css("a :hover { x: y; }"), "a :hover{x:y}")
+
+    def test_split_rules(self):
+        self.assertEqual(
+            split_rules(minify_css(STYLESHEET))[-2:],
+            [".note>p{width:calc(100% - 2px)}", "@media (max-width:600px){body{padding:0}}"],
+        )
+
+class TestCriticalCss(unittest.TestCase):
+    def test_only_rules_for_present_tags(self):
+        sheet = Stylesheet(STYLESHEET)
+        critical = sheet.critical_for({"body", "h2", "code"})
+        self.assertIn("h1,h2{", critical)
+        self.assertIn('body{color', critical)
+        self.assertNotIn("pre code", critical)
+        self.assertNotIn("a:hover", critical)
+        self.assertNotIn(".note>p", critical)
+        # At-rules can't be ruled out from tag names alone
+        self.assertIn("@media", critical)
+        self.assertIn(".note>p", sheet.critical_for({"p"}))
+
+    def test_collect_tags(self):
+        node = markdown_to_html_node("# Title\n\n```\ncode\n```\n\n- [link](/x)")
+        self.assertEqual(collect_tags(node), {"div", "h1", "pre", "code", "ul", "li", "a"})
+
+    def test_defer_stylesheets(self):
+        sheets = {"index.css": Stylesheet(STYLESHEET)}
+        template = '<head><link href="/index.css" rel="stylesheet" /><link href="/other.css" rel="stylesheet" /></head>'
+        content, critical = defer_stylesheets(template, sheets)
+        self.assertTrue(content.startswith("<head><style>{{ CriticalCSS }}</style><link rel=\"preload\" href=\"/index.css\""))
+        self.assertIn('<noscript><link href="/index.css" rel="stylesheet" /></noscript>', content)
+        self.assertIn('<link href="/other.css" rel="stylesheet" /></head>', content)
+        self.assertIn("head", critical.template_tags)
+
+        unchanged, critical = defer_stylesheets("<head></head>", sheets)
+        self.assertEqual(unchanged, "<head></head>")
+        self.assertIsNone(critical)
+
+    def test_template_hash_follows_stylesheet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('<link href="/index.css" rel="stylesheet" />{{ Content }}')
+            plain = load_template(path, "/site/")
+            first = load_template(path, "/site/", {"index.css": Stylesheet("a{color:red}")})
+            second = load_template(path, "/site/", {"index.css": Stylesheet("a{color:blue}")})
+        self.assertIsNone(plain.critical_styles)
+        self.assertEqual(len({plain.source_hash, first.source_hash, second.source_hash}), 3)
+        html = first.render(Content="<p><a>x</a></p>", CriticalCSS=first.critical_styles.for_content("<a>"))
+        self.assertIn("<style>a{color:red}</style>", html)
+        self.assertIn('href="/site/index.css"', html)
+
+class TestCssPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        os.makedirs(os.path.join(self.static, "images"))
+        with open(os.path.join(self.static, "index.css"), "w", encoding="utf-8") as f:
+            f.write(STYLESHEET)
+        with open(os.path.join(self.static, "images", "a.png"), "wb") as f:
+            f.write(b"png")
+        self.pipeline = CssPipeline(self.static, self.docs, os.path.join(self.cache, "css.json"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self):
+        return sync_folder(self.static, self.docs, os.path.join(self.cache, "static.json"), skip=self.pipeline.handles)
+
+    def test_minified_output_is_written_once(self):
+        self.sync()
+        report = self.pipeline.build()
+        self.assertEqual(report.minified, 1)
+        with open(os.path.join(self.docs, "index.css"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), minify_css(STYLESHEET))
+        self.assertEqual(list(self.pipeline.stylesheets), ["index.css"])
+
+        # The sync neither overwrites nor deletes the minified file
+        self.assertEqual(self.sync().copied, 0)
+        report = self.pipeline.build()
+        self.assertEqual((report.minified, report.unchanged), (0, 1))
+
+    def test_fingerprinted_output(self):
+        with open(os.path.join(self.static, "index.css"), "a", encoding="utf-8") as f:
+            f.write("body { background: url('/images/a.png'); }")
+        self.pipeline.build(fingerprint=True, assets={"images/a.png": "images/a.123.png"})
+        output = self.pipeline.assets["index.css"]
+        self.assertRegex(output, r"^index\.[0-9a-f]{10}\.css$")
+        with open(os.path.join(self.docs, output), encoding="utf-8") as f:
+            self.assertIn("url('/images/a.123.png')", f.read())
+
+        self.pipeline.build()
+        self.assertEqual(os.listdir(self.docs), ["index.css"])
+
+    def test_deleted_stylesheet_is_removed(self):
+        self.pipeline.build()
+        os.remove(os.path.join(self.static, "index.css"))
+        report = self.pipeline.build()
+        self.assertEqual(report.removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+
+if __name__ == "__main__":
+    unittest.main()
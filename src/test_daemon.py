@@ -0,0 +1,58 @@
+import os
+import tempfile
+import threading
+import unittest
+from builder import BuildConfig, SiteBuilder
+from daemon import BuildDaemon, send_request
+
+class TestBuildDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "content"))
+        os.makedirs(os.path.join(root, "static"))
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join("content", "index.md"), "# Home")
+        self.socket_path = os.path.join(root, "build.sock")
+        self.daemon = BuildDaemon(self.socket_path, SiteBuilder(BuildConfig(root)))
+        self.thread = threading.Thread(target=self.daemon.run)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            send_request(self.socket_path, "shutdown", timeout=5)
+            self.thread.join(5)
+        self.daemon.server_close()
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(os.path.join(self.tmp.name, path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_build_requests(self):
+        response = send_request(self.socket_path, "build", timeout=30)
+        self.assertEqual(response["status"], 0)
+        self.assertIn("Pages: 1 generated", response["output"])
+
+        self.write(os.path.join("content", "index.md"), "# Home again")
+        response = send_request(self.socket_path, "build", timeout=30)
+        self.assertIn("Pages: 1 generated", response["output"])
+        with open(os.path.join(self.tmp.name, "docs", "index.html"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<title>Home again</title><div><h1>Home again</h1></div>")
+
+        self.assertEqual(send_request(self.socket_path, "ping", timeout=5), {"status": 0, "builds": 2})
+        self.assertEqual(send_request(self.socket_path, "nonsense", timeout=5)["status"], 2)
+
+    def test_shutdown_removes_socket(self):
+        self.assertEqual(send_request(self.socket_path, "shutdown", timeout=5), {"status": 0})
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.daemon.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_second_daemon_is_refused(self):
+        with self.assertRaises(OSError):
+            BuildDaemon(self.socket_path, None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from deploy import diff_outputs, write_deploy_manifest
+from manifest import load_manifest
+
+class TestDiffOutputs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, "cache", "outputs.json")
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.write("index.html", "<p>home</p>")
+        self.write(os.path.join("blog", "post.html"), "<p>post</p>")
+        self.write("old.css", "p{}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative_path, text):
+        with open(os.path.join(self.root, relative_path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_first_build_adds_everything(self):
+        report = diff_outputs(self.root, self.manifest)
+        self.assertEqual(report.added, ["blog/post.html", "index.html", "old.css"])
+        self.assertEqual((report.changed, report.deleted, report.unchanged), ([], [], 0))
+
+    def test_added_changed_deleted(self):
+        diff_outputs(self.root, self.manifest)
+        self.write("index.html", "<p>home again</p>")
+        self.write("new.js", "")
+        os.remove(os.path.join(self.root, "old.css"))
+        # Rewritten with the same bytes: a new mtime alone isn't a change
+        self.write(os.path.join("blog", "post.html"), "<p>post</p>")
+        os.utime(os.path.join(self.root, "blog", "post.html"), ns=(0, 0))
+
+        report = diff_outputs(self.root, self.manifest)
+        self.assertEqual(report.added, ["new.js"])
+        self.assertEqual(report.changed, ["index.html"])
+        self.assertEqual(report.deleted, ["old.css"])
+        self.assertEqual(report.unchanged, 1)
+
+    def test_deploy_manifest(self):
+        report = diff_outputs(self.root, self.manifest)
+        path = os.path.join(self.tmp.name, "deploy.json")
+        write_deploy_manifest(path, report)
+        manifest = load_manifest(path, "added")
+        self.assertEqual(manifest["added"], report.added)
+        self.assertEqual(manifest["deleted"], [])
+
+if __name__ == "__main__":
+    unittest.main()
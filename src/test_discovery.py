@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from discovery import FileIndex, scan_tree
+from page_generator import discover_pages
+
+class TestScanTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        for path in ("b.md", "a.md", "notes.txt", "blog/post.md", "blog/.draft.md", ".git/HEAD", "z/empty.md"):
+            full_path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w", encoding="utf-8") as f:
+                f.write(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sorted_and_filtered(self):
+        entries = scan_tree(self.root, suffix=".md", skip_hidden=True)
+        self.assertEqual(
+            [entry.relative_path for entry in entries],
+            ["a.md", "b.md", os.path.join("blog", "post.md"), os.path.join("z", "empty.md")],
+        )
+        self.assertEqual(entries[2].path, os.path.join(self.root, "blog", "post.md"))
+        self.assertEqual(entries[2].stat.st_size, len("blog/post.md"))
+
+    def test_hidden_files_included_by_default(self):
+        paths = [entry.relative_path for entry in scan_tree(self.root)]
+        self.assertIn(os.path.join(".git", "HEAD"), paths)
+        self.assertIn("notes.txt", paths)
+
+    def test_one_stat_per_file(self):
+        # Directory entries answer is_dir/is_file themselves; only files are stat'ed
+        with mock.patch("os.stat", side_effect=AssertionError("unexpected stat")):
+            self.assertEqual(len(scan_tree(self.root)), 7)
+
+    def test_file_index_reuses_quiet_listings(self):
+        # Directories last changed well outside the racy window
+        for folder in (self.root, os.path.join(self.root, "blog")):
+            os.utime(folder, ns=(0, 0))
+        index = FileIndex()
+        first = scan_tree(self.root, index=index)
+        self.assertEqual(index.hits, 0)
+        self.assertEqual([entry.relative_path for entry in scan_tree(self.root, index=index)],
+                         [entry.relative_path for entry in first])
+        self.assertGreaterEqual(index.hits, 2)
+
+        # A new file moves its directory's mtime, so the listing is read again
+        with open(os.path.join(self.root, "blog", "new.md"), "w", encoding="utf-8") as f:
+            f.write("new")
+        paths = [entry.relative_path for entry in scan_tree(self.root, suffix=".md", index=index)]
+        self.assertIn(os.path.join("blog", "new.md"), paths)
+
+    def test_discover_pages(self):
+        pages = discover_pages(self.root, "/out")
+        self.assertEqual(
+            [html_path for _, html_path in pages],
+            ["/out/a.html", "/out/b.html", "/out/blog/post.html", "/out/z/empty.html"],
+        )
+        # An unreadable tree is an error, never an empty site
+        with self.assertRaises(OSError):
+            discover_pages(os.path.join(self.root, "missing"), "/out")
+
+if __name__ == "__main__":
+    unittest.main()
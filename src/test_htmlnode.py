@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, write_html
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_html_empty(self):
@@ -58,6 +59,13 @@ class TestHTMLNode(unittest.TestCase):
             None,
         )
 
+    def test_leaf_children_accept_only_none(self):
+        node = LeafNode("p", "text")
+        node.children = None
+        self.assertIsNone(node.children)
+        with self.assertRaises(AttributeError):
+            node.children = [LeafNode(None, "child")]
+
 class TestPropsToHTML(unittest.TestCase):
     def test_multiple_props(self):
         node = HTMLNode(tag="img", value=None, props={"src": "image.png", "alt": "An image"})
@@ -306,6 +314,55 @@ class TestParentNode(unittest.TestCase):
         # Assert
         expected = '<main><article class="blog-post"><h1>My Programming Journey</h1><section><p>Yesterday I learned about HTML nodes.</p><img src="code.jpg" alt="Code screenshot"><div class="highlight"><strong>Key takeaway:</strong> Always test your code!</div></section></article></main>'
         self.assertEqual(result, expected)
+
+    def test_url_prefix_rewrites_site_relative_urls(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "Home", {"href": "/blog/tom"}),
+                LeafNode("img", "", {"src": "/images/tom.png", "alt": "/not-a-url"}),
+                LeafNode("a", "Out", {"href": "https://boot.dev"}),
+            ]
+        )
+        self.assertEqual(
+            node.to_html("/site/"),
+            '<p><a href="/site/blog/tom">Home</a><img src="/site/images/tom.png" alt="/not-a-url"></img><a href="https://boot.dev">Out</a></p>'
+        )
+
+    def test_assets_rename_rewritten_urls(self):
+        node = ParentNode("p", [LeafNode("img", "", {"src": "/images/tom.png"}), LeafNode("a", "x", {"href": "/blog"})])
+        assets = {"images/tom.png": "images/tom.0123456789.png"}
+        self.assertEqual(
+            node.to_html("/site/", assets),
+            '<p><img src="/site/images/tom.0123456789.png"></img><a href="/site/blog">x</a></p>'
+        )
+        # Without a url_prefix nothing is rewritten at all
+        self.assertIn('src="/images/tom.png"', node.to_html(None, assets))
+
+
+class TestWriteHTML(unittest.TestCase):
+    def test_writes_to_file_object(self):
+        node = ParentNode("div", [LeafNode("b", "Bold"), LeafNode(None, " text")])
+        out = io.StringIO()
+        write_html(node, out)
+        self.assertEqual(out.getvalue(), "<div><b>Bold</b> text</div>")
+
+    def test_writes_to_callable(self):
+        parts = []
+        write_html(LeafNode("a", "Home", {"href": "/"}), parts.append, "/site/")
+        self.assertEqual("".join(parts), '<a href="/site/">Home</a>')
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode(None, "leaf")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(html, "<span>" * 5000 + "leaf" + "</span>" * 5000)
+
+    def test_invalid_child_in_nested_parent(self):
+        node = ParentNode("div", [ParentNode("p", ["Not a node"])])
+        with self.assertRaises(TypeError):
+            write_html(node, io.StringIO())
         
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
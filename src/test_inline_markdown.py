@@ -425,6 +425,54 @@ class TestTextToTextNodes(unittest.TestCase):
         self.assertEqual(nodes[0].text, "")
         self.assertEqual(nodes[0].text_type, TextType.TEXT)
 
+    def test_text_to_textnodes_repeated_spans(self):
+        text = "**a** and **b**, `c` and `d`"
+        nodes = text_to_textnodes(text)
+        self.assertEqual(
+            nodes,
+            [
+                TextNode("a", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+                TextNode(", ", TextType.TEXT),
+                TextNode("c", TextType.CODE),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("d", TextType.CODE),
+                TextNode("", TextType.TEXT),
+            ],
+        )
+
+    def test_text_to_textnodes_link_with_underscores(self):
+        nodes = text_to_textnodes("see [my_page](/my_page) and ![pic](/a_b.png)")
+        self.assertEqual(
+            nodes,
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("my_page", TextType.LINK, "/my_page"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("pic", TextType.IMAGE, "/a_b.png"),
+                TextNode("", TextType.TEXT),
+            ],
+        )
+
+    def test_text_to_textnodes_literal_brackets(self):
+        nodes = text_to_textnodes("[not a link] and ! alone")
+        self.assertEqual(nodes, [TextNode("[not a link] and ! alone", TextType.TEXT)])
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("an **unclosed span")
+
+    def test_text_to_textnodes_stray_delimiter_after_pair(self):
+        self.assertEqual(
+            text_to_textnodes("```\ncode"),
+            [TextNode("", TextType.CODE), TextNode("`\ncode", TextType.TEXT)],
+        )
+        self.assertEqual(
+            text_to_textnodes("`a` and `b"),
+            [TextNode("a", TextType.CODE), TextNode(" and `b", TextType.TEXT)],
+        )
+
 """     def test_text_to_textnodes_complex(self):
         text = "This is **text** with an _italic_ word and a `code block` and an ![image](https://example.com) and a [link](https://boot.dev)"
         nodes = text_to_textnodes(text)
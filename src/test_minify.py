@@ -0,0 +1,72 @@
+import io
+import unittest
+from block_markdown import markdown_to_html_node
+from minify import MinifyWriter, render_minified
+from template import CompiledTemplate
+
+def minify(html, chunk_size=None):
+    output = io.StringIO()
+    writer = MinifyWriter(output)
+    chunk_size = chunk_size or len(html) or 1
+    for i in range(0, len(html), chunk_size):
+        writer.write(html[i:i + chunk_size])
+    writer.close()
+    return output.getvalue(), writer.saved
+
+class TestMinifyWriter(unittest.TestCase):
+    def test_drops_whitespace_around_block_tags(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title>T</title>\n  </head>\n  <body>\n    <p>Hi</p>\n  </body>\n</html>\n"
+        self.assertEqual(
+            minify(html)[0],
+            "<!doctype html><html><head><title>T</title></head><body><p>Hi</p></body></html>",
+        )
+
+    def test_keeps_single_space_between_inline_content(self):
+        html = "<p>some   <b>bold</b>\n  and <i>italic</i>  text</p>"
+        self.assertEqual(minify(html)[0], "<p>some <b>bold</b> and <i>italic</i> text</p>")
+
+    def test_code_blocks_are_untouched(self):
+        html = "<div>\n<pre><code>def f():\n    return  1\n\n</code></pre>\n<p>use <code>a  =  b</code> here</p></div>"
+        self.assertEqual(
+            minify(html)[0],
+            "<div><pre><code>def f():\n    return  1\n\n</code></pre><p>use <code>a  =  b</code> here</p></div>",
+        )
+
+    def test_attributes_and_comments_are_kept(self):
+        html = '<p><img alt="a  >  b" src="/x.png" />  <!-- x > y -->  tail</p>'
+        self.assertEqual(minify(html)[0], '<p><img alt="a  >  b" src="/x.png" /> <!-- x > y --> tail</p>')
+
+    def test_bare_less_than_is_text(self):
+        self.assertEqual(minify("<p>a  <  b</p>")[0], "<p>a < b</p>")
+
+    def test_non_ascii_spaces_are_content(self):
+        self.assertEqual(minify("<p>a  b</p>")[0], "<p>a  b</p>")
+
+    def test_chunk_boundaries_do_not_matter(self):
+        html = (
+            "<div>\n  <h1>Title</h1>\n  <pre><code>x  =  1\n</code></pre>\n"
+            "  <p>text <a href=\"/a b\">link</a>  <!-- c --></p>\n</div>\n"
+        )
+        expected = minify(html)
+        for chunk_size in (1, 2, 3, 5, 8):
+            self.assertEqual(minify(html, chunk_size), expected)
+
+    def test_reports_bytes_saved(self):
+        html = "<div>\n    <p>a</p>\n</div>"
+        output, saved = minify(html)
+        self.assertEqual(saved, len(html.encode("utf-8")) - len(output.encode("utf-8")))
+        self.assertEqual(saved, 6)
+
+    def test_render_minified_streams_template(self):
+        template = CompiledTemplate("<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>")
+        node = markdown_to_html_node("# Title\n\n```\nkeep   this\n```")
+        output = io.StringIO()
+        saved = render_minified(template, output, Content=node.to_html())
+        self.assertEqual(
+            output.getvalue(),
+            "<html><body><div><h1>Title</h1><pre><code>keep   this</code></pre></div></body></html>",
+        )
+        self.assertGreater(saved, 0)
+
+if __name__ == "__main__":
+    unittest.main()
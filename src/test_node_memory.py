@@ -0,0 +1,93 @@
+import tracemalloc
+import unittest
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+# The node classes as they were before __slots__, kept here as the baseline
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, None, props)
+        self.children = None
+
+    @property
+    def children(self):
+        return None
+
+    @children.setter
+    def children(self, value):
+        if value is not None:
+            raise AttributeError("LeafNode cannot have children.")
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+PARAGRAPHS_PER_PAGE = 2000
+
+def build_page(text_node_class, leaf_class, parent_class):
+    # Roughly what markdown_to_html_node keeps alive for a long page
+    text_nodes = []
+    paragraphs = []
+    for i in range(PARAGRAPHS_PER_PAGE):
+        spans = [
+            text_node_class("Some text ", TextType.TEXT),
+            text_node_class("bold", TextType.BOLD),
+            text_node_class(" and a ", TextType.TEXT),
+            text_node_class("link", TextType.LINK, "/blog/tom"),
+        ]
+        text_nodes.extend(spans)
+        leaves = [
+            leaf_class(None, "Some text "),
+            leaf_class("b", "bold"),
+            leaf_class(None, " and a "),
+            leaf_class("a", "link", {"href": "/blog/tom"}),
+        ]
+        paragraphs.append(parent_class("p", leaves))
+    return text_nodes, parent_class("div", paragraphs)
+
+def measure(*classes):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        page = build_page(*classes)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    allocations = sum(stat.count_diff for stat in stats)
+    del page
+    return peak, allocations
+
+class TestNodeMemoryBenchmark(unittest.TestCase):
+    def test_slotted_nodes_use_less_memory(self):
+        slotted_peak, slotted_allocations = measure(TextNode, LeafNode, ParentNode)
+        dict_peak, dict_allocations = measure(DictTextNode, DictLeafNode, DictParentNode)
+
+        report = (
+            f"peak bytes per page: {slotted_peak} slotted vs {dict_peak} with __dict__; "
+            f"allocations per page: {slotted_allocations} vs {dict_allocations}"
+        )
+        self.assertLess(slotted_peak, dict_peak, report)
+        self.assertLess(slotted_allocations, dict_allocations, report)
+
+    def test_slotted_nodes_have_no_instance_dict(self):
+        for node in (TextNode("a", TextType.TEXT), LeafNode("b", "a"), ParentNode("p", [LeafNode(None, "a")])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+if __name__ == "__main__":
+    unittest.main()
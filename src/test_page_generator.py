@@ -1,5 +1,15 @@
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
 import unittest
-from page_generator import extract_title
+from unittest import mock
+from page_generator import extract_title, generate_pages_recursive, PageBuildError, render_page, render_page_streaming
+from template import CompiledTemplate
+from render_cache import PageBodyCache
+from manifest import hash_file
+from manifest import load_manifest
 
 class TestExtractTitle(unittest.TestCase):
     def test_valid_h1(self):
@@ -15,4 +25,202 @@ class TestExtractTitle(unittest.TestCase):
     def test_other_headers(self):
         # Example with no h1, only h2 or higher
         with self.assertRaises(ValueError):
-            extract_title("## Not an h1")
\ No newline at end of file
+            extract_title("## Not an h1")
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, "cache", "pages.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def build(self, jobs=1, minify=False):
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, jobs, minify=minify)
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts), encoding="utf-8") as f:
+            return f.read()
+
+    def mtime(self, *parts):
+        return os.stat(os.path.join(self.dest, *parts)).st_mtime_ns
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        before = self.mtime("index.html")
+        os.utime(os.path.join(self.dest, "index.html"), ns=(0, 0))
+        self.build()
+        self.assertEqual(self.mtime("index.html"), 0)
+        self.assertNotEqual(before, 0)
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        os.utime(os.path.join(self.dest, "index.html"), ns=(0, 0))
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        self.build()
+        with open(os.path.join(self.dest, "index.html"), encoding="utf-8") as f:
+            self.assertIn("Home again", f.read())
+
+    def test_unchanged_stat_skips_hashing(self):
+        self.build()
+        with mock.patch("page_generator.hash_file", side_effect=AssertionError("source was rehashed")):
+            self.build()
+
+        # Touching a source makes it hashed again, but identical bytes still skip the render
+        path = os.path.join(self.content, "index.md")
+        os.utime(path, ns=(0, 0))
+        os.utime(os.path.join(self.dest, "index.html"), ns=(0, 0))
+        self.build()
+        self.assertEqual(self.mtime("index.html"), 0)
+        self.assertEqual(load_manifest(self.manifest)["pages"]["index.md"]["mtime_ns"], 0)
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        os.utime(os.path.join(self.dest, "blog", "post.html"), ns=(0, 0))
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertNotEqual(self.mtime("blog", "post.html"), 0)
+
+    def test_deleted_source_is_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertEqual(list(load_manifest(self.manifest)["pages"]), ["index.md"])
+
+    def test_renderer_change_rebuilds_all(self):
+        self.build()
+        output = io.StringIO()
+        with mock.patch("page_generator.RENDERER_VERSION", 2), mock.patch("render_cache.RENDERER_VERSION", 2):
+            with contextlib.redirect_stdout(output):
+                self.build()
+        self.assertIn("Pages: 2 generated", output.getvalue())
+        self.assertEqual(load_manifest(self.manifest)["pages"]["index.md"]["renderer"], 2)
+
+    def test_parallel_build_matches_serial(self):
+        self.build()
+        serial = [self.read("index.html"), self.read("blog", "post.html")]
+        os.remove(self.manifest)
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.build(jobs=2)
+        self.assertEqual([self.read("index.html"), self.read("blog", "post.html")], serial)
+
+    def test_toggling_minify_rebuilds(self):
+        self.write(self.template, "<title>{{ Title }}</title>\n  <main>\n    {{ Content }}\n  </main>")
+        self.build()
+        self.assertIn("\n  <main>", self.read("index.html"))
+        self.build(minify=True)
+        self.assertEqual(self.read("index.html"), "<title>Home</title><main><div><h1>Home</h1></div></main>")
+
+    def test_asset_map_change_rebuilds(self):
+        self.write(self.template, '<img src="/a.png" />{{ Content }}')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, assets={"a.png": "a.1.png"})
+        self.assertEqual(self.read("index.html").count("/a.1.png"), 2)
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, assets={"a.png": "a.2.png"})
+        self.assertEqual(self.read("index.html").count("/a.2.png"), 2)
+
+    def test_identical_output_is_not_rewritten(self):
+        self.build()
+        os.utime(os.path.join(self.dest, "index.html"), ns=(0, 0))
+        # A new basepath forces a render, but this page has no links so its bytes don't change
+        generate_pages_recursive(self.content, self.template, self.dest, "/site/", self.manifest)
+        self.assertEqual(self.mtime("index.html"), 0)
+        self.assertEqual([name for name in os.listdir(self.dest) if name.endswith(".tmp")], [])
+
+    def test_failures_are_aggregated(self):
+        self.write(os.path.join(self.content, "blog", "bad.md"), "no title")
+        self.write(os.path.join(self.content, "worse.md"), "still no title")
+        with self.assertRaises(PageBuildError) as context:
+            self.build(jobs=2)
+        failed = [os.path.basename(path) for path, _ in context.exception.failures]
+        self.assertEqual(failed, ["bad.md", "worse.md"])
+        self.assertIn("ValueError", context.exception.failures[0][1])
+        # The good pages are still built and recorded, the bad ones are retried next time
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "index.html")))
+        self.assertEqual(sorted(load_manifest(self.manifest)["pages"]), [os.path.join("blog", "post.md"), "index.md"])
+
+
+class TestTemplateOnlyFastPath(TestIncrementalBuild):
+    def build(self, jobs=1, basepath="/", minify=False):
+        body_cache = PageBodyCache(os.path.join(self.tmp.name, "cache", "bodies"))
+        generate_pages_recursive(self.content, self.template, self.dest, basepath, self.manifest, jobs,
+                                 body_cache=body_cache, minify=minify)
+        return body_cache
+
+    def test_template_change_refills_from_cached_body(self):
+        body_cache = self.build()
+        source_hash = hash_file(os.path.join(self.content, "index.md"))
+        # Tamper with the cached body to prove the markdown isn't reparsed
+        body_cache.put(source_hash, "Cached", '<p><a href="\x00x">cached</a></p>')
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build(basepath="/site/")
+        self.assertEqual(self.read("index.html"), '<h1>Cached</h1><p><a href="/site/x">cached</a></p>')
+
+    def test_source_change_still_renders(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# New")
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.build()
+        self.assertEqual(self.read("index.html"), "<h1>New</h1>")
+
+    def test_unused_bodies_are_pruned(self):
+        body_cache = self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertEqual(len(os.listdir(body_cache.directory)), 1)
+
+class TestStreamingRender(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "big.md")
+        self.template = CompiledTemplate('<title>{{ Title }}</title><link href="/a.css">{{ Content }}', "/site/")
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write("# Changelog\n\n")
+            for i in range(4000):
+                f.write(f"## Release {i}\n\n- fixed **bug** {i}\n- see [notes](/notes/{i})\n\n")
+                f.write("```\nraw output line\n\nmore output\n```\n\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_streaming_matches_in_memory(self):
+        in_memory = os.path.join(self.tmp.name, "out", "memory.html")
+        streamed = os.path.join(self.tmp.name, "out", "streamed.html")
+        render_page(self.source, self.template, in_memory)
+        render_page_streaming(self.source, self.template, streamed)
+        self.assertEqual(self.read(streamed), self.read(in_memory))
+
+    def test_streaming_memory_is_bounded(self):
+        dest = os.path.join(self.tmp.name, "streamed.html")
+        tracemalloc.start()
+        try:
+            render_page_streaming(self.source, self.template, dest)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, os.path.getsize(self.source) // 4)
+
+    def test_failed_stream_leaves_no_output(self):
+        with open(self.source, "a", encoding="utf-8") as f:
+            f.write("an **unclosed span\n")
+        dest = os.path.join(self.tmp.name, "streamed.html")
+        with self.assertRaises(Exception):
+            render_page_streaming(self.source, self.template, dest)
+        self.assertEqual(os.listdir(self.tmp.name), ["big.md"])
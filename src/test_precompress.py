@@ -0,0 +1,74 @@
+import gzip
+import os
+import random
+import tempfile
+import unittest
+from precompress import precompress_tree, remove_precompressed
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, "cache", "gzip.json")
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.write("index.html", "<p>hello</p>" * 500)
+        self.write(os.path.join("blog", "post.html"), "<p>post</p>" * 500)
+        self.write("tiny.css", "p{}")
+        self.write("image.png", "x" * 5000)
+        # Random bytes don't shrink at all, so no .gz is worth keeping
+        with open(os.path.join(self.root, "noise.txt"), "wb") as f:
+            f.write(random.Random(0).randbytes(5000))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative_path, text):
+        with open(os.path.join(self.root, relative_path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def precompress(self, jobs=1):
+        return precompress_tree(self.root, self.manifest, jobs=jobs, min_size=1024)
+
+    def test_compresses_eligible_files(self):
+        report = self.precompress(jobs=2)
+        self.assertEqual(report.compressed, 2)
+        self.assertEqual(report.not_worth_it, 1)
+        with gzip.open(os.path.join(self.root, "index.html.gz"), "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 500)
+        for skipped in ("tiny.css.gz", "image.png.gz", "noise.txt.gz"):
+            self.assertFalse(os.path.exists(os.path.join(self.root, skipped)))
+
+    def test_unchanged_sources_are_skipped(self):
+        self.precompress()
+        report = self.precompress()
+        self.assertEqual((report.compressed, report.unchanged), (0, 3))
+
+    def test_output_is_deterministic(self):
+        self.precompress()
+        with open(os.path.join(self.root, "index.html.gz"), "rb") as f:
+            first = f.read()
+        os.remove(self.manifest)
+        self.precompress()
+        with open(os.path.join(self.root, "index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_changed_and_deleted_sources(self):
+        self.precompress()
+        self.write("index.html", "<p>changed</p>" * 500)
+        os.remove(os.path.join(self.root, "blog", "post.html"))
+        report = self.precompress()
+        self.assertEqual((report.compressed, report.removed), (1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+
+    def test_turning_precompression_off_removes_gz_files(self):
+        self.precompress()
+        report = remove_precompressed(self.root, self.manifest)
+        self.assertEqual(report.removed, 2)
+        self.assertEqual(sorted(name for name in os.listdir(self.root) if name.endswith(".gz")), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog", "post.html.gz")))
+        self.assertFalse(os.path.exists(self.manifest))
+        # Nothing is left to clean up on the next build
+        self.assertEqual(remove_precompressed(self.root, self.manifest).removed, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+from profiler import BuildProfiler
+from page_generator import generate_pages_recursive
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stage_records_wall_and_cpu(self):
+        profiler = BuildProfiler(trace_memory=False)
+        with profiler.stage("render"):
+            sum(range(10000))
+        self.assertEqual(profiler.stages[0]["stage"], "render")
+        self.assertGreaterEqual(profiler.stages[0]["wall"], 0)
+        self.assertGreaterEqual(profiler.stages[0]["cpu"], 0)
+
+    def test_report_lists_slowest_pages_first(self):
+        profiler = BuildProfiler(trace_memory=False)
+        profiler.record_page("fast.md", 0.1, 0.1)
+        profiler.record_page("slow.md", 2.0, 1.5)
+        report = profiler.report(top=1)
+        self.assertIn("slow.md", report)
+        self.assertNotIn("fast.md", report)
+
+    def test_build_records_pages_and_memory(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            os.makedirs(content)
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            for name in ("a.md", "b.md"):
+                with open(os.path.join(content, name), "w") as f:
+                    f.write("# Title\n\nSome **text**")
+
+            profiler = BuildProfiler()
+            profiler.start()
+            generate_pages_recursive(content, template, os.path.join(root, "docs"), "/", profiler=profiler)
+            profiler.stop()
+
+            self.assertEqual([os.path.basename(p["page"]) for p in profiler.pages], ["a.md", "b.md"])
+            self.assertIn("render", [s["stage"] for s in profiler.stages])
+            self.assertGreater(profiler.peak_memory, 0)
+
+            path = os.path.join(root, "profile.json")
+            profiler.write_json(path)
+            with open(path) as f:
+                self.assertEqual(len(json.load(f)["pages"]), 2)
+
+    def test_peak_includes_stages_before_the_pages(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            os.makedirs(content)
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            with open(os.path.join(content, "a.md"), "w") as f:
+                f.write("# Title")
+
+            profiler = BuildProfiler()
+            profiler.start()
+            with profiler.stage("load"):
+                buffer = bytearray(8 * 1024 * 1024)
+                del buffer
+            generate_pages_recursive(content, template, os.path.join(root, "docs"), "/", profiler=profiler)
+            profiler.stop()
+
+            # Rendering the page reset the process peak, but the earlier stage still counts
+            self.assertLess(profiler.pages[0]["peak_memory"], 8 * 1024 * 1024)
+            self.assertGreaterEqual(profiler.peak_memory, 8 * 1024 * 1024)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from block_markdown import markdown_to_html_node
+from render_cache import BlockCache, PageBodyCache, markdown_to_cached_html
+
+MARKDOWN = """
+# Title
+
+A paragraph with a [link](/blog/tom) and ![image](/images/tom.png).
+
+- one
+- _two_
+
+```
+print("hi")
+```
+"""
+
+class TestBlockCache(unittest.TestCase):
+    def test_matches_uncached_render(self):
+        cache = BlockCache()
+        expected = markdown_to_html_node(MARKDOWN).to_html("/site/")
+        self.assertEqual(markdown_to_cached_html(MARKDOWN, cache, "/site/"), expected)
+        # A cached fragment is reusable under a different basepath
+        self.assertEqual(markdown_to_cached_html(MARKDOWN, cache, "/"), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(cache.hits, 4)
+
+    def test_assets_are_applied_when_filling(self):
+        cache = BlockCache()
+        assets = {"images/tom.png": "images/tom.0123456789.png"}
+        expected = markdown_to_html_node(MARKDOWN).to_html("/site/", assets)
+        self.assertIn("tom.0123456789.png", expected)
+        self.assertEqual(markdown_to_cached_html(MARKDOWN, cache, "/site/", assets), expected)
+        # Fragments stay asset-neutral, so the same cache serves a build without fingerprints
+        self.assertEqual(markdown_to_cached_html(MARKDOWN, cache, "/site/"), markdown_to_html_node(MARKDOWN).to_html("/site/"))
+
+    def test_only_edited_block_is_rendered(self):
+        cache = BlockCache()
+        markdown_to_cached_html(MARKDOWN, cache)
+        cache.hits = cache.misses = 0
+        markdown_to_cached_html(MARKDOWN.replace("- one", "- uno"), cache)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_bytes=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 8)
+
+    def test_persists_in_lru_order(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "cache", "blocks.json")
+            cache = BlockCache(path)
+            cache.put("a", "1")
+            cache.put("b", "2")
+            cache.get("a")
+            cache.save()
+
+            loaded = BlockCache(path).load()
+            self.assertEqual(list(loaded.entries.items()), [("b", "2"), ("a", "1")])
+            self.assertEqual(loaded.take_updates()[0], {})
+
+    def test_untouched_cache_is_not_saved(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "blocks.json")
+            cache = BlockCache(path)
+            cache.put("a", "1")
+            cache.save()
+            os.utime(path, ns=(0, 0))
+
+            loaded = BlockCache(path).load()
+            loaded.save()
+            self.assertEqual(os.stat(path).st_mtime_ns, 0)
+            # A hit moves the entry in the LRU order, so it is worth saving
+            loaded.get("a")
+            loaded.save()
+            self.assertNotEqual(os.stat(path).st_mtime_ns, 0)
+
+    def test_other_renderer_is_ignored(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = BlockCache(os.path.join(root, "blocks.json"))
+            cache.put("a", "1")
+            cache.save()
+            body_cache = PageBodyCache(os.path.join(root, "bodies"))
+            body_cache.put("hash", "Title", "<p>body</p>")
+
+            with mock.patch("render_cache.RENDERER_VERSION", 2):
+                self.assertEqual(list(BlockCache(cache.path).load().entries), [])
+                self.assertIsNone(body_cache.get("hash"))
+
+    def test_empty_document(self):
+        with self.assertRaises(ValueError):
+            markdown_to_cached_html("", BlockCache())
+
+if __name__ == "__main__":
+    unittest.main()
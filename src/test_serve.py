@@ -0,0 +1,153 @@
+import gzip
+import http.client
+import os
+import tempfile
+import threading
+import unittest
+from copystatic import write_asset_manifest
+from manifest import hash_bytes
+from precompress import precompress_tree
+from serve import make_server, parse_range, resolve_path
+
+class TestServeHelpers(unittest.TestCase):
+    def test_resolve_path_strips_basepath(self):
+        self.assertEqual(resolve_path("/site/blog/", "/root", "/site/"), "/root/blog")
+        self.assertEqual(resolve_path("/site", "/root", "/site/"), "/root")
+        self.assertEqual(resolve_path("/a%20b.png?x=1", "/root"), "/root/a b.png")
+        self.assertIsNone(resolve_path("/other/index.html", "/root", "/site/"))
+
+    def test_resolve_path_stays_inside_root(self):
+        self.assertIsNone(resolve_path("/../etc/passwd", "/root"))
+        self.assertIsNone(resolve_path("/%2e%2e/etc/passwd", "/root"))
+        self.assertEqual(resolve_path("/blog/../index.html", "/root"), "/root/index.html")
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+        self.assertEqual(parse_range("bytes=100-", 100), "unsatisfiable")
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.html = b"<p>hello</p>" * 500
+        self.png = bytes(range(256)) * 40
+        self.write("index.html", self.html)
+        self.write(os.path.join("blog", "index.html"), b"<p>blog</p>")
+        self.write("image.png", self.png)
+        precompress_tree(self.root, os.path.join(self.cache_dir, "gzip.json"))
+        self.start("/site/")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def start(self, basepath):
+        self.server = make_server(self.root, basepath, port=0, cache_dir=self.cache_dir, quiet=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def write(self, relative_path, data):
+        with open(os.path.join(self.root, relative_path), "wb") as f:
+            f.write(data)
+
+    def touch_later(self, relative_path):
+        # Coarse filesystem timestamps could otherwise make a rewrite look unchanged
+        path = os.path.join(self.root, relative_path)
+        mtime_ns = os.stat(path).st_mtime_ns + 5_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def request(self, path, method="GET", **headers):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    def test_serves_files_under_basepath(self):
+        response, body = self.request("/site/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.html)
+        self.assertEqual(response.getheader("Content-Type"), "text/html; charset=utf-8")
+        self.assertEqual(self.request("/index.html")[0].status, 404)
+        self.assertEqual(self.request("/site/missing.html")[0].status, 404)
+
+    def test_directory_without_slash_redirects(self):
+        response, _ = self.request("/site/blog")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/site/blog/")
+
+    def test_etag_comes_from_manifest(self):
+        response, _ = self.request("/site/index.html")
+        self.assertEqual(response.getheader("ETag"), f'"{hash_bytes(self.html)}"')
+        self.assertEqual(self.server.etags.hashed, 0)
+
+    def test_conditional_request_returns_304(self):
+        response, _ = self.request("/site/image.png")
+        etag = response.getheader("ETag")
+        response, body = self.request("/site/image.png", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+
+        self.write("image.png", self.png[::-1])
+        self.touch_later("image.png")
+        response, body = self.request("/site/image.png", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.png[::-1])
+
+    def test_gzip_negotiation(self):
+        response, body = self.request("/site/index.html", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(gzip.decompress(body), self.html)
+        self.assertTrue(response.getheader("ETag").endswith('-gzip"'))
+
+        response, body = self.request("/site/index.html", **{"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, self.html)
+
+    def test_stale_gzip_sibling_is_ignored(self):
+        self.write("index.html", b"<p>changed</p>")
+        self.touch_later("index.html")
+        response, body = self.request("/site/index.html", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"<p>changed</p>")
+
+    def test_range_requests(self):
+        response, body = self.request("/site/image.png", Range="bytes=100-199")
+        self.assertEqual(response.status, 206)
+        self.assertEqual(response.getheader("Content-Range"), f"bytes 100-199/{len(self.png)}")
+        self.assertEqual(body, self.png[100:200])
+
+        response, body = self.request("/site/image.png", Range="bytes=-16")
+        self.assertEqual(body, self.png[-16:])
+
+        response, _ = self.request("/site/image.png", Range=f"bytes={len(self.png)}-")
+        self.assertEqual(response.status, 416)
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        response, body = self.request("/site/image.png", Range="bytes=0-9", **{"If-Range": '"stale"'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.png)
+
+    def test_fingerprinted_assets_are_immutable(self):
+        self.assertEqual(self.request("/site/image.png")[0].getheader("Cache-Control"), "no-cache")
+        write_asset_manifest(self.root, {"logical.png": "image.png"})
+        response, _ = self.request("/site/image.png")
+        self.assertEqual(response.getheader("Cache-Control"), "public, max-age=31536000, immutable")
+
+    def test_head_has_no_body(self):
+        response, body = self.request("/site/image.png", method="HEAD")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Length"), str(len(self.png)))
+        self.assertEqual(body, b"")
+
+if __name__ == "__main__":
+    unittest.main()
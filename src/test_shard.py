@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from page_generator import generate_pages_recursive, PageBuildError
+from shard import merge_shards, parse_shard, shard_for, ShardMergeError, SHARD_MANIFEST_NAME
+from discovery import scan_tree
+
+PAGES = ["index.md", "about.md", "blog/one.md", "blog/two.md", "blog/three.md", "notes/a.md", "notes/b.md"]
+
+class TestShardAssignment(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_assignment_is_stable(self):
+        # Pinned so a change to the hash can't silently reshuffle every CI fleet
+        self.assertEqual([shard_for(path, 3) for path in PAGES], [1, 3, 3, 1, 1, 2, 3])
+        self.assertEqual(shard_for("index.md", 1), 1)
+        self.assertTrue(all(1 <= shard_for(path, 4) <= 4 for path in PAGES))
+
+class TestShardedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        for path in PAGES:
+            self.write(os.path.join(self.content, path), f"# {path}")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def build(self, name, shard=None):
+        dest = os.path.join(self.tmp.name, name)
+        self.write(os.path.join(dest, "index.css"), "body{}")
+        generate_pages_recursive(self.content, self.template, dest, "/",
+                                 os.path.join(self.tmp.name, "cache", name, "pages.json"), shard=shard)
+        return dest
+
+    def tree(self, root):
+        files = {}
+        for entry in scan_tree(root):
+            with open(entry.path, "rb") as f:
+                files[entry.relative_path] = f.read()
+        return files
+
+    def test_shards_cover_every_page_once(self):
+        full = self.build("full")
+        shards = [self.build(f"shard{i}", (i, 3)) for i in (1, 2, 3)]
+        built = [
+            sum(1 for entry in scan_tree(shard) if entry.relative_path.endswith(".html"))
+            for shard in shards
+        ]
+        self.assertEqual(sum(built), len(PAGES))
+
+        merged = os.path.join(self.tmp.name, "merged")
+        self.write(os.path.join(merged, "stale.html"), "old")
+        report = merge_shards(shards, merged)
+        self.assertEqual(report.pages, len(PAGES))
+        self.assertEqual(report.deleted, 1)
+        self.assertEqual(self.tree(merged), self.tree(full))
+        self.assertNotIn(SHARD_MANIFEST_NAME, os.listdir(merged))
+
+        # Merging again leaves every file alone
+        report = merge_shards(shards, merged)
+        self.assertEqual((report.copied, report.deleted), (0, 0))
+
+    def test_unsharded_build_drops_shard_manifest(self):
+        dest = self.build("docs", (1, 2))
+        self.assertTrue(os.path.isfile(os.path.join(dest, SHARD_MANIFEST_NAME)))
+        self.build("docs")
+        self.assertFalse(os.path.exists(os.path.join(dest, SHARD_MANIFEST_NAME)))
+
+    def test_missing_shard(self):
+        shards = [self.build(f"shard{i}", (i, 3)) for i in (1, 2)]
+        with self.assertRaises(ShardMergeError) as caught:
+            merge_shards(shards, os.path.join(self.tmp.name, "merged"))
+        expected = sorted(path for path in PAGES if shard_for(path, 3) == 3)
+        self.assertEqual(caught.exception.missing, expected)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "merged")))
+
+    def test_failed_page_is_missing(self):
+        self.write(os.path.join(self.content, "blog", "two.md"), "no title")
+        shards = []
+        for i in (1, 2):
+            try:
+                shards.append(self.build(f"shard{i}", (i, 2)))
+            except PageBuildError:
+                shards.append(os.path.join(self.tmp.name, f"shard{i}"))
+        with self.assertRaises(ShardMergeError) as caught:
+            merge_shards(shards, os.path.join(self.tmp.name, "merged"))
+        self.assertEqual(caught.exception.missing, ["blog/two.md"])
+
+    def test_conflicts(self):
+        shards = [self.build(f"shard{i}", (i, 2)) for i in (1, 2)]
+        self.write(os.path.join(shards[1], "index.css"), "body{color:red}")
+        with self.assertRaises(ShardMergeError) as caught:
+            merge_shards(shards, os.path.join(self.tmp.name, "merged"))
+        self.assertEqual(len(caught.exception.conflicts), 1)
+        self.assertIn("index.css", caught.exception.conflicts[0])
+
+        with self.assertRaises(ShardMergeError) as caught:
+            merge_shards([shards[0], shards[0]], os.path.join(self.tmp.name, "merged"))
+        self.assertIn("given twice", caught.exception.conflicts[0])
+
+    def test_shards_of_different_content(self):
+        first = self.build("shard1", (1, 2))
+        self.write(os.path.join(self.content, "new.md"), "# New")
+        second = self.build("shard2", (2, 2))
+        with self.assertRaises(ShardMergeError) as caught:
+            merge_shards([first, second], os.path.join(self.tmp.name, "merged"))
+        self.assertEqual(caught.exception.conflicts, [f"new.md differs in {second}"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from staging import StagedOutput
+
+class TestStagedOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.output, "blog"))
+        self.write(os.path.join(self.output, "index.html"), "old home")
+        self.write(os.path.join(self.output, "blog", "post.html"), "old post")
+        self.manifest = os.path.join(self.tmp.name, "pages.json")
+        self.write(self.manifest, "{}")
+        self.staged = StagedOutput(self.output, [self.manifest])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def stage_edit(self):
+        self.staged.prepare()
+        # Build stages replace files, they never write through the links
+        tmp_path = os.path.join(self.staged.path, "index.html.tmp")
+        self.write(tmp_path, "new home")
+        os.replace(tmp_path, os.path.join(self.staged.path, "index.html"))
+        os.remove(os.path.join(self.staged.path, "blog", "post.html"))
+
+    def test_prepare_links_previous_output(self):
+        self.assertEqual(self.staged.prepare(), (2, 0))
+        staged_post = os.path.join(self.staged.path, "blog", "post.html")
+        self.assertTrue(os.path.samefile(staged_post, os.path.join(self.output, "blog", "post.html")))
+
+    def test_output_is_untouched_until_commit(self):
+        self.stage_edit()
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "old home")
+        self.assertTrue(os.path.isfile(os.path.join(self.output, "blog", "post.html")))
+
+        self.staged.commit()
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "new home")
+        self.assertFalse(os.path.exists(os.path.join(self.output, "blog", "post.html")))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs", "pages.json"])
+
+    def test_commit_falls_back_to_renames(self):
+        self.stage_edit()
+        with mock.patch("staging.exchange_paths", side_effect=OSError(22, "Invalid argument")):
+            self.assertEqual(self.staged.commit(), "rename")
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "new home")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs", "pages.json"])
+
+    def test_first_build_has_nothing_to_swap(self):
+        staged = StagedOutput(os.path.join(self.tmp.name, "fresh"))
+        self.assertEqual(staged.prepare(), (0, 0))
+        self.write(os.path.join(staged.path, "index.html"), "home")
+        self.assertEqual(staged.commit(), "rename")
+        self.assertEqual(self.read(os.path.join(self.tmp.name, "fresh", "index.html")), "home")
+
+    def test_abandon_keeps_output_and_forgets_manifests(self):
+        self.stage_edit()
+        self.staged.abandon()
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "old home")
+        self.assertFalse(os.path.exists(self.staged.path))
+        self.assertFalse(os.path.exists(self.manifest))
+
+    def test_prepare_clears_leftovers(self):
+        os.makedirs(os.path.join(self.staged.path, "junk"))
+        self.staged.prepare()
+        self.assertFalse(os.path.exists(os.path.join(self.staged.path, "junk")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from template import CompiledTemplate
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = CompiledTemplate("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>Body</p>"),
+            "<title>Hi</title><article><p>Body</p></article>",
+        )
+
+    def test_slot_can_repeat(self):
+        template = CompiledTemplate("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render(Title="x"), "x|x")
+
+    def test_basepath_applied_to_template(self):
+        template = CompiledTemplate('<link href="/index.css" /><img src="/a.png" /><a href="https://x.com">', "/site/")
+        self.assertEqual(
+            template.render(),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="https://x.com">',
+        )
+
+    def test_assets_applied_to_template(self):
+        template = CompiledTemplate('<link href="/index.css" /><img src="/a.png" />', "/site/", assets={"index.css": "index.abc.css"})
+        self.assertEqual(template.render(), '<link href="/site/index.abc.css" /><img src="/site/a.png" />')
+
+    def test_basepath_not_applied_to_slot_values(self):
+        template = CompiledTemplate("{{ Content }}", "/site/")
+        self.assertEqual(template.render(Content='<a href="/raw">'), '<a href="/raw">')
+
+    def test_render_to_streams_callable_slots(self):
+        template = CompiledTemplate("<title>{{ Title }}</title>{{ Content }}")
+        parts = []
+        template.render_to(parts.append, Title="Hi", Content=lambda write: (write("<p>"), write("</p>")))
+        self.assertEqual("".join(parts), "<title>Hi</title><p></p>")
+
+    def test_missing_slot(self):
+        template = CompiledTemplate("{{ Title }}")
+        with self.assertRaises(ValueError):
+            template.render()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from page_generator import generate_pages_recursive
+from render_cache import PageBodyCache
+from watcher import SiteWatcher
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.dest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Make sure the poller sees a new mtime even on coarse filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts), encoding="utf-8") as f:
+            return f.read()
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.check(), [])
+
+    def test_page_edit_renders_only_that_page(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home v2")
+        results = self.watcher.check()
+        self.assertEqual(len(results), 1)
+        self.assertIn("<title>Home v2</title>", self.read("index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_static_change_copies_that_file(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(len(self.watcher.check()), 1)
+        self.assertEqual(self.read("index.css"), "body { margin: 0 }")
+
+    def test_template_change_refills_from_cached_bodies(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home v2")
+        self.watcher.check()
+        self.watcher.bodies[os.path.join(self.content, "index.md")] = ("Cached", "<p>cached</p>")
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.watcher.check()
+        self.assertEqual(self.read("index.html"), "<h1>Cached</h1><p>cached</p>")
+        self.assertEqual(self.read("blog", "post.html"), "<h1>Post</h1><div><h1>Post</h1></div>")
+
+    def test_hardlinked_static_edit_in_place(self):
+        watcher = SiteWatcher(self.content, self.static, self.template, self.dest, strategy="hardlink")
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(watcher.check(), [f"copied {os.path.join(self.static, 'index.css')}"])
+        self.assertTrue(os.path.samefile(os.path.join(self.static, "index.css"), os.path.join(self.dest, "index.css")))
+        # Editing the shared inode in place is no longer a SameFileError
+        with open(os.path.join(self.static, "index.css"), "a", encoding="utf-8") as f:
+            f.write(" p {}")
+        stat = os.stat(os.path.join(self.static, "index.css"))
+        os.utime(os.path.join(self.static, "index.css"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+        results = watcher.check()
+        self.assertFalse(any(result.startswith("ERROR") for result in results))
+        self.assertEqual(self.read("index.css"), "body { margin: 0 } p {}")
+
+    def test_first_template_edit_reparses_nothing(self):
+        # Seeded from the body cache a full build left behind
+        body_cache = PageBodyCache(os.path.join(self.tmp.name, "bodies"))
+        generate_pages_recursive(self.content, self.template, self.dest, "/site/",
+                                 os.path.join(self.tmp.name, "pages.json"), body_cache=body_cache)
+        with mock.patch("watcher.markdown_to_html_node", side_effect=AssertionError("markdown was reparsed")):
+            watcher = SiteWatcher(self.content, self.static, self.template, self.dest, "/site/", body_cache=body_cache)
+            self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+            results = watcher.check()
+        self.assertEqual(results, ["reloaded template", f"refilled {os.path.join(self.content, 'blog', 'post.md')}",
+                                   f"refilled {os.path.join(self.content, 'index.md')}"])
+        self.assertEqual(self.read("index.html"), "<h1>Home</h1><div><h1>Home</h1></div>")
+
+        # Without a body cache the bodies are parsed at startup instead
+        watcher = SiteWatcher(self.content, self.static, self.template, self.dest)
+        with mock.patch("watcher.markdown_to_html_node", side_effect=AssertionError("markdown was reparsed")):
+            self.write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+            results = watcher.check()
+        self.assertEqual(len(results), 3)
+        self.assertFalse(any(result.startswith("ERROR") for result in results))
+        self.assertEqual(self.read("blog", "post.html"), "<h2>Post</h2><div><h1>Post</h1></div>")
+
+    def test_deleted_page_is_removed(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post v2")
+        self.watcher.check()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.watcher.check()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_broken_page_reports_error_and_continues(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        self.write(os.path.join(self.static, "index.css"), "p {}")
+        results = self.watcher.check()
+        self.assertTrue(results[0].startswith("ERROR"))
+        self.assertEqual(self.read("index.css"), "p {}")
+        self.assertEqual(self.watcher.check(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import os
+import time
+from block_markdown import markdown_to_html_node
+from copystatic import publish_file, remove_empty_parents
+from manifest import hash_bytes
+from page_generator import extract_title, write_page
+from render_cache import URL_PREFIX_MARKER
+from template import load_template
+
+def snapshot_tree(root):
+    files = {}
+    if os.path.isfile(root):
+        stat = os.stat(root)
+        files[root] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    for dir_path, dir_names, file_names in os.walk(root):
+        # Hidden files and directories are skipped, same as the page generator
+        dir_names[:] = [name for name in dir_names if not name.startswith('.')]
+        for name in file_names:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(dir_path, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def diff_snapshots(old, new):
+    changed = {path for path, state in new.items() if old.get(path) != state}
+    deleted = set(old) - set(new)
+    return changed, deleted
+
+class SiteWatcher:
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, basepath="/", interval=0.5, debounce=0.2,
+                 minify=False, css=None, critical_css=False, body_cache=None,
+                 strategy="copy"):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.interval = interval
+        self.debounce = debounce
+        self.minify = minify
+        # CssPipeline that owns the stylesheets under static_dir, if any
+        self.css = css
+        self.critical_css = critical_css
+        # Same publish strategy as the full build's static sync
+        self.strategy = strategy
+        # PageBodyCache shared with full builds, if any
+        self.body_cache = body_cache
+
+        self.template = self.load_template()
+        # source path -> (title, body html), so a template change doesn't reparse markdown.
+        # Bodies keep the URL prefix marker, the same form the body cache stores
+        self.bodies = {}
+        self.state = self.snapshot()
+        self.seed_bodies()
+
+    def snapshot(self):
+        state = {}
+        for root in (self.content_dir, self.static_dir, self.template_path):
+            state.update(snapshot_tree(root))
+        return state
+
+    def page_output(self, source_path):
+        relative_path = os.path.relpath(source_path, self.content_dir)
+        return os.path.join(self.dest_dir, os.path.splitext(relative_path)[0] + '.html')
+
+    def static_output(self, source_path):
+        return os.path.join(self.dest_dir, os.path.relpath(source_path, self.static_dir))
+
+    def is_page(self, path):
+        return path.startswith(self.content_dir + os.sep) and path.endswith('.md')
+
+    def is_static(self, path):
+        return path.startswith(self.static_dir + os.sep)
+
+    def seed_bodies(self):
+        # Filled up front, so even the first template edit reparses nothing; the last
+        # build usually left every body in the body cache
+        for source_path in sorted(self.state):
+            if not self.is_page(source_path):
+                continue
+            with open(source_path, 'rb') as markdown_file:
+                markdown_bytes = markdown_file.read()
+            cached = self.body_cache.get(hash_bytes(markdown_bytes)) if self.body_cache is not None else None
+            if cached is not None:
+                self.bodies[source_path] = tuple(cached)
+                continue
+            try:
+                self.render_body(source_path, markdown_bytes)
+            except Exception:
+                # Reported when the page is next edited
+                pass
+
+    def render_body(self, source_path, markdown_bytes=None):
+        if markdown_bytes is None:
+            with open(source_path, 'rb') as markdown_file:
+                markdown_bytes = markdown_file.read()
+        markdown_content = markdown_bytes.decode('utf-8')
+
+        title = extract_title(markdown_content)
+        body = markdown_to_html_node(markdown_content).to_html(URL_PREFIX_MARKER)
+        self.bodies[source_path] = (title, body)
+        if self.body_cache is not None:
+            self.body_cache.put(hash_bytes(markdown_bytes), title, body)
+        return title, body
+
+    def write_page(self, source_path):
+        title, body = self.bodies.get(source_path) or self.render_body(source_path)
+        write_page(self.template, title, body, self.page_output(source_path), self.minify)
+
+    def remove_output(self, dest_path):
+        if os.path.isfile(dest_path):
+            os.remove(dest_path)
+            remove_empty_parents(dest_path, self.dest_dir)
+
+    def load_template(self):
+        stylesheets = self.css.stylesheets if self.css is not None and self.critical_css else None
+        return load_template(self.template_path, self.basepath, stylesheets)
+
+    def reload_template(self, template_path):
+        self.template = self.load_template()
+
+    def is_stylesheet(self, path):
+        return self.css is not None and self.is_static(path) and self.css.handles(path)
+
+    def rebuild_css(self, static_dir):
+        self.css.build()
+
+    def copy_static(self, source_path):
+        dest_path = self.static_output(source_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        publish_file(source_path, dest_path, self.strategy)
+
+    def rerender_page(self, source_path):
+        self.render_body(source_path)
+        self.write_page(source_path)
+
+    def remove_page(self, source_path):
+        self.bodies.pop(source_path, None)
+        self.remove_output(self.page_output(source_path))
+
+    def plan(self, changed, deleted):
+        actions = []
+
+        for path in sorted(deleted):
+            if self.is_page(path):
+                actions.append((f"removed page {path}", self.remove_page, path))
+            elif self.is_static(path) and not self.is_stylesheet(path):
+                actions.append((f"removed asset {path}", self.remove_output, self.static_output(path)))
+
+        css_changed = any(self.is_stylesheet(path) for path in changed | deleted)
+        if css_changed:
+            actions.append(("rebuilt stylesheets", self.rebuild_css, self.static_dir))
+
+        # The template goes first so every page below is written with the new one;
+        # inlined critical CSS makes a stylesheet edit a template change too
+        template_changed = self.template_path in changed or (css_changed and self.critical_css)
+        if template_changed:
+            actions.append(("reloaded template", self.reload_template, self.template_path))
+
+        for path in sorted(changed):
+            if self.is_page(path):
+                # Only the edited page is reparsed; the others keep their cached body
+                actions.append((f"rendered {path}", self.rerender_page, path))
+            elif self.is_static(path) and not self.is_stylesheet(path):
+                actions.append((f"copied {path}", self.copy_static, path))
+
+        if template_changed:
+            edited = set(changed)
+            for path in sorted(self.state):
+                if self.is_page(path) and path not in edited:
+                    actions.append((f"refilled {path}", self.write_page, path))
+
+        return actions
+
+    def apply(self, changed, deleted):
+        results = []
+        for description, action, path in self.plan(changed, deleted):
+            try:
+                action(path)
+                results.append(description)
+            except Exception as e:
+                results.append(f"ERROR: {path}: {type(e).__name__}: {e}")
+        return results
+
+    def check(self):
+        new_state = self.snapshot()
+        changed, deleted = diff_snapshots(self.state, new_state)
+        if not changed and not deleted:
+            return []
+
+        # Commit the new state first so a failing page isn't retried every poll
+        self.state = new_state
+        return self.apply(changed, deleted)
+
+    def wait_until_quiet(self):
+        # Debounce: editors often write a file in several steps, so wait until
+        # two polls in a row see the same tree before rebuilding
+        previous = self.snapshot()
+        while True:
+            time.sleep(self.debounce)
+            current = self.snapshot()
+            if current == previous:
+                return
+            previous = current
+
+    def run(self):
+        print(f"Watching {self.content_dir}, {self.static_dir} and {self.template_path}")
+        try:
+            while True:
+                time.sleep(self.interval)
+                if self.snapshot() == self.state:
+                    continue
+                self.wait_until_quiet()
+                for line in self.check():
+                    print(line)
+        except KeyboardInterrupt:
+            print("Stopped watching")